@@ -1,6 +1,7 @@
 
 
 from real_world_coastlines_example import *
+from bokeh.layouts import row
 
 def example_north_atlantic():
     """Default: North Atlantic with Gulf Stream"""
@@ -103,9 +104,10 @@ def generate_regional_currents(config, width, height):
 def create_visualization(region_config):
     """Create visualization for a specific region"""
     
-    if not CARTOPY_AVAILABLE:
-        print("\n⚠️  ERROR: Cartopy is required")
+    if not coastlines_available():
+        print("\n⚠️  ERROR: Cartopy (or a prebaked coastline image) is required")
         print("Install with: conda install -c conda-forge cartopy")
+        print("or run scripts/prebake_coastlines.py where Cartopy is available")
         return
     
     config = region_config()
@@ -133,7 +135,7 @@ def create_visualization(region_config):
     
     # Generate currents
     print("Generating ocean currents...")
-    x, y, dx, dy, mag = generate_regional_currents(
+    x, y, dx, dy = generate_regional_currents(
         config, config['width'], config['height']
     )
     print("✓ Currents generated")
@@ -144,7 +146,6 @@ def create_visualization(region_config):
         height=config['height'],
         x_coords=x, y_coords=y,
         dx_values=dx, dy_values=dy,
-        magnitudes=mag,
         particle_count=2000,
         particle_size=1,
         particle_life=120,
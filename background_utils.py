@@ -2,19 +2,155 @@
 Utilities for converting Bokeh plots to base64 images for use as backgrounds
 """
 
-import base64
+import functools
+import hashlib
 import io
-from typing import Optional
-from PIL import Image
+import json
+import mmap
+import os
+import tempfile
+from typing import Callable, Optional
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw
+from bokeh.models import (Circle, GlyphRenderer, LayoutDOM, Patch, Patches, Plot,
+                          Range1d, Scatter)
 
-def bokeh_to_base64(plot, width: int = None, height: int = None) -> str:
+try:
+    # SIMD-accelerated drop-in for the stdlib encoder (pip install pybase64)
+    from pybase64 import b64encode as _b64encode
+except ImportError:
+    from base64 import b64encode as _b64encode
+
+try:
+    # Anti-Grain polygon rasterizer, faster than ImageDraw on detailed
+    # coastlines (pip install aggdraw)
+    import aggdraw
+except ImportError:
+    aggdraw = None
+
+# Where expensive backgrounds (selenium exports, Cartopy renders) are kept
+# between runs. Safe to delete at any time
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'bokeh_flow')
+
+# Part of every cache key. Bump it when the way cached images are built
+# changes, so entries written by older code are no longer read
+CACHE_VERSION = 1
+
+
+def _data_uri(mime_type: str, data) -> str:
+    """Base64-encode a bytes-like object into a ``data:`` URI."""
+    # Append the encoded bytes to the ASCII prefix and decode once, instead
+    # of decoding to str and copying the whole payload again into an f-string
+    out = bytearray(f"data:{mime_type};base64,".encode('ascii'))
+    out += _b64encode(data)
+    return out.decode('ascii')
+
+
+def cached_data_uri(key_parts, create: Callable[[], str]) -> str:
+    """
+    Return a data URI from the on-disk cache, creating it on a miss.
+    
+    Entries are files in CACHE_DIR, one per key, and are never evicted.
+    To clear the cache (or reclaim the space), delete CACHE_DIR; it is
+    recreated on the next miss.
+    
+    Args:
+        key_parts: Everything the image depends on, including where it
+            came from (e.g. an input file's mtime or the renderer used), so
+            a change of source gives a new key. Its repr() is hashed into
+            the cache key together with CACHE_VERSION, so use plain tuples
+            of numbers and strings
+        create: Zero-argument callable that builds the data URI on a miss
+    
+    Returns:
+        Base64 data URI string
+    
+    Example:
+        bg = cached_data_uri(
+            ('coastlines', 'cartopy', lon_min, lon_max, lat_min, lat_max,
+             width, height),
+            lambda: render_coastlines(...)
+        )
+    """
+    key = hashlib.blake2b(repr((CACHE_VERSION, key_parts)).encode('utf-8'),
+                          digest_size=16).hexdigest()
+    path = os.path.join(CACHE_DIR, f"{key}.b64")
+    
+    try:
+        with open(path, 'r', encoding='ascii') as f:
+            return f.read()
+    except OSError:
+        pass
+    
+    data_uri = create()
+    
+    # Write to a temp file and rename, so an interrupted run never leaves a
+    # truncated entry behind. A read-only cache just means no caching.
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='ascii') as f:
+                f.write(data_uri)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass
+    
+    return data_uri
+
+
+def _export_bokeh_png(plot, width: Optional[int], height: Optional[int],
+                      webdriver=None) -> str:
+    """Render a Bokeh plot through selenium and return it as a data URI."""
+    from bokeh.io.export import get_screenshot_as_png
+    from bokeh.io.webdriver import webdriver_control
+    
+    # Browser startup costs seconds, so every export reuses Bokeh's own
+    # driver (the one export_png uses too), which Bokeh quits at exit
+    if webdriver is None:
+        webdriver = webdriver_control.get()
+    
+    # Grab the rendered plot as a PIL image so it is only PNG-encoded once,
+    # after any resizing
+    img = get_screenshot_as_png(plot, driver=webdriver)
+    
+    # Resize if needed (bilinear is plenty for a background image)
+    if width and height:
+        img = img.resize((width, height), Image.BILINEAR)
+    elif width:
+        aspect = img.height / img.width
+        img = img.resize((width, int(width * aspect)), Image.BILINEAR)
+    elif height:
+        aspect = img.width / img.height
+        img = img.resize((int(height * aspect), height), Image.BILINEAR)
+    
+    # Fast zlib settings: backgrounds are throwaway, encode speed matters
+    # more than the last few percent of file size
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', compress_level=3, optimize=False)
+    
+    # Encode as base64
+    return _data_uri('image/png', buffer.getbuffer())
+
+
+def bokeh_to_base64(plot, width: int = None, height: int = None,
+                    webdriver=None) -> str:
     """
     Convert a Bokeh plot to a base64 data URI.
     
+    Exports are cached on disk (see ``cached_data_uri``), keyed on the
+    plot's JSON and the requested size. All exports share Bokeh's
+    headless browser (``webdriver_control.get()``), started on first use.
+    
     Args:
         plot: Bokeh Figure or Layout object
         width: Optional width override (uses plot width if not specified)
         height: Optional height override (uses plot height if not specified)
+        webdriver: Optional selenium webdriver to use instead of the
+            shared one
     
     Returns:
         Base64 data URI string (data:image/png;base64,...)
@@ -33,36 +169,15 @@ def bokeh_to_base64(plot, width: int = None, height: int = None) -> str:
         )
     """
     try:
-        from bokeh.io import export_png
-        from bokeh.models import Plot
-        
-        # Create temporary file-like object
-        buffer = io.BytesIO()
-        
-        # Export to PNG
-        export_png(plot, filename=buffer)
-        
-        # Resize if needed
-        if width or height:
-            buffer.seek(0)
-            img = Image.open(buffer)
-            if width and height:
-                img = img.resize((width, height), Image.LANCZOS)
-            elif width:
-                aspect = img.height / img.width
-                img = img.resize((width, int(width * aspect)), Image.LANCZOS)
-            elif height:
-                aspect = img.width / img.height
-                img = img.resize((int(height * aspect), height), Image.LANCZOS)
-            
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-        
-        # Encode as base64
-        buffer.seek(0)
-        img_base64 = base64.b64encode(buffer.read()).decode('utf-8')
+        from bokeh.embed import json_item
         
-        return f"data:image/png;base64,{img_base64}"
+        # Selenium export takes seconds; reuse the result while the plot and
+        # requested size are unchanged
+        plot_json = json.dumps(json_item(plot), sort_keys=True)
+        return cached_data_uri(
+            ('bokeh_to_base64', plot_json, width, height),
+            lambda: _export_bokeh_png(plot, width, height, webdriver)
+        )
     
     except ImportError:
         raise ImportError(
@@ -75,6 +190,133 @@ def bokeh_to_base64(plot, width: int = None, height: int = None) -> str:
         raise RuntimeError(f"Failed to convert Bokeh plot to base64: {e}")
 
 
+def _bokeh_color(color, alpha) -> Optional[tuple]:
+    """Convert a Bokeh color + alpha to an RGBA tuple (None if invisible)."""
+    if color is None or alpha <= 0:
+        return None
+    if isinstance(color, str):
+        rgba = ImageColor.getcolor(color, 'RGBA')
+    else:
+        rgba = tuple(color) + (255,) * (4 - len(color))
+    return rgba[:3] + (int(round(rgba[3] * alpha)),)
+
+
+def _rasterize_bokeh_plot(plot, width: int, height: int):
+    """
+    Draw the simple glyphs of a Bokeh plot straight into a PIL image.
+    
+    Supports Patch, Patches, Circle and circle Scatter glyphs with scalar
+    visual properties on a plot with fixed Range1d ranges. The data ranges
+    are mapped onto the whole image. Line dashes are drawn solid.
+    
+    Returns:
+        PIL Image, or None if the plot uses anything unsupported
+    """
+    if not isinstance(plot, Plot):
+        return None
+    if not (isinstance(plot.x_range, Range1d) and isinstance(plot.y_range, Range1d)):
+        return None
+    
+    x0, x1 = plot.x_range.start, plot.x_range.end
+    y0, y1 = plot.y_range.start, plot.y_range.end
+    sx = width / (x1 - x0)
+    sy = height / (y1 - y0)
+    px_scale = width / plot.width  # screen-unit sizes follow the image size
+    
+    def to_px(xs, ys):
+        return [((x - x0) * sx, (y1 - y) * sy) for x, y in zip(xs, ys)]
+    
+    bg = _bokeh_color(plot.background_fill_color, plot.background_fill_alpha)
+    img = Image.new('RGB', (width, height), bg[:3] if bg else '#ffffff')
+    draw = ImageDraw.Draw(img, 'RGBA')  # RGBA mode blends translucent fills
+    
+    for renderer in plot.renderers:
+        if not isinstance(renderer, GlyphRenderer) or not renderer.visible:
+            continue
+        glyph = renderer.glyph
+        data = renderer.data_source.data
+        
+        def column(name):
+            value = getattr(glyph, name)
+            if isinstance(value, str):
+                return data[value]
+            return [value]
+        
+        # Only scalar visuals are supported, not colors mapped from columns
+        visuals = [getattr(glyph, name) for name in
+                   ('fill_color', 'fill_alpha', 'line_color', 'line_alpha', 'line_width')]
+        if any(isinstance(v, str) and v in data for v in visuals):
+            return None
+        fill = _bokeh_color(glyph.fill_color, glyph.fill_alpha)
+        line = _bokeh_color(glyph.line_color, glyph.line_alpha)
+        line_width = max(1, int(round(glyph.line_width * px_scale)))
+        
+        if isinstance(glyph, (Patch, Patches)):
+            if isinstance(glyph, Patch):
+                polygons = [(column('x'), column('y'))]
+            else:
+                polygons = zip(column('xs'), column('ys'))
+            for xs, ys in polygons:
+                draw.polygon(to_px(xs, ys), fill=fill, outline=line,
+                             width=line_width if line else 0)
+        
+        elif isinstance(glyph, (Circle, Scatter)):
+            if isinstance(glyph, Scatter):
+                if glyph.marker != 'circle':
+                    return None
+                radii = [size / 2 * px_scale for size in column('size')]
+            else:
+                radii = [r * sx for r in column('radius')]
+            centers = to_px(column('x'), column('y'))
+            if len(radii) == 1:
+                radii = radii * len(centers)
+            for (cx, cy), r in zip(centers, radii):
+                draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=fill,
+                             outline=line, width=line_width if line else 0)
+        
+        else:
+            return None
+    
+    return img
+
+
+def bokeh_to_base64_fast(plot, width: int = None, height: int = None) -> str:
+    """
+    Convert a simple Bokeh plot to a base64 data URI without a browser.
+    
+    Patches and circles are redrawn directly with PIL, which avoids the
+    selenium startup of ``bokeh_to_base64``. Plots using anything else
+    (other glyphs, auto-ranging axes, color-mapped columns, layouts) fall
+    back to ``bokeh_to_base64``.
+    
+    Args:
+        plot: Bokeh Figure or Layout object
+        width: Optional width override (uses plot width if not specified)
+        height: Optional height override (uses plot height if not specified)
+    
+    Returns:
+        Base64 data URI string (data:image/png;base64,...)
+    """
+    try:
+        out_width = width or plot.width
+        out_height = height or plot.height
+        if width and not height:
+            out_height = int(width * plot.height / plot.width)
+        elif height and not width:
+            out_width = int(height * plot.width / plot.height)
+        img = _rasterize_bokeh_plot(plot, out_width, out_height)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        img = None
+    
+    if img is None:
+        return bokeh_to_base64(plot, width=width, height=height)
+    
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', compress_level=1, optimize=False)
+    
+    return _data_uri('image/png', buffer.getbuffer())
+
+
 def image_file_to_base64(filepath: str) -> str:
     """
     Convert an image file to a base64 data URI.
@@ -93,11 +335,6 @@ def image_file_to_base64(filepath: str) -> str:
             ...
         )
     """
-    with open(filepath, 'rb') as f:
-        img_bytes = f.read()
-    
-    img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-    
     # Detect image type from extension
     ext = filepath.lower().split('.')[-1]
     mime_types = {
@@ -109,16 +346,56 @@ def image_file_to_base64(filepath: str) -> str:
     }
     mime_type = mime_types.get(ext, 'image/png')
     
-    return f"data:{mime_type};base64,{img_base64}"
+    # Memory-map the file and hand the mapping straight to the encoder, so
+    # the raw image bytes are never copied into a Python bytes object
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap cannot map an empty file
+            return _data_uri(mime_type, b'')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _data_uri(mime_type, mm)
+
+
+# Palette index of invalid (masked, NaN or infinite) cells; the colormap
+# gets the indices below it
+_INVALID_INDEX = 255
+
+
+@functools.lru_cache(maxsize=None)
+def _colormap_palette(cmap: str) -> bytes:
+    """RGB PNG palette for a matplotlib colormap name (cached per name)."""
+    import matplotlib
+    
+    colormap = matplotlib.colormaps[cmap]
+    palette = (colormap(np.linspace(0, 1, _INVALID_INDEX))[:, :3] * 255).round()
+    palette = np.vstack([palette, np.zeros((1, 3))])  # invalid cells (transparent)
+    return palette.astype(np.uint8).tobytes()
+
+
+def _imsave_base64(array, cmap) -> str:
+    """Render an array through matplotlib's imsave (RGB(A) data, Colormap objects)."""
+    import matplotlib.image
+    
+    buffer = io.BytesIO()
+    matplotlib.image.imsave(buffer, array, cmap=cmap, origin='lower', format='png')
+    return _data_uri('image/png', buffer.getbuffer())
 
 
 def numpy_array_to_base64(array, cmap: str = 'viridis') -> str:
     """
-    Convert a numpy array to a base64 data URI using matplotlib.
+    Convert a numpy array to a base64 data URI using a matplotlib colormap.
+    
+    A 2-D array with a colormap name is scaled to the min/max of its
+    finite, unmasked values like ``imshow`` and written as an 8-bit
+    palettized PNG with one pixel per array element (first row at the
+    bottom, like ``origin='lower'``). Masked, NaN and infinite cells are
+    transparent. RGB(A) arrays and ``Colormap`` objects are rendered with
+    matplotlib instead.
     
     Args:
-        array: 2D numpy array
-        cmap: Matplotlib colormap name
+        array: 2D numpy array (masked arrays allowed), or an RGB(A) image
+            of shape (rows, columns, 3 or 4)
+        cmap: Matplotlib colormap name or Colormap object
     
     Returns:
         Base64 data URI string
@@ -135,31 +412,50 @@ def numpy_array_to_base64(array, cmap: str = 'viridis') -> str:
             ...
         )
     """
+    ndim = np.ndim(array)
+    if ndim not in (2, 3) or np.size(array) == 0:
+        raise ValueError(
+            "numpy_array_to_base64 needs a non-empty 2-D array or an RGB(A) "
+            f"image, got shape {np.shape(array)}"
+        )
+    
     try:
-        import matplotlib.pyplot as plt
-        import numpy as np
-        
-        fig, ax = plt.subplots(figsize=(8, 6))
-        ax.imshow(array, cmap=cmap, origin='lower')
-        ax.axis('off')
-        plt.tight_layout(pad=0)
-        
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', bbox_inches='tight', pad_inches=0)
-        plt.close(fig)
+        if ndim == 3 or not isinstance(cmap, str):
+            return _imsave_base64(array, cmap)
         
-        buffer.seek(0)
-        img_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-        
-        return f"data:image/png;base64,{img_base64}"
-    
+        # Colormap lookup tables are built once per name and reused
+        palette = _colormap_palette(cmap)
     except ImportError:
         raise ImportError(
-            "numpy_array_to_base64 requires matplotlib. Install with:\n"
+            "numpy_array_to_base64 needs matplotlib for its colormaps. Install with:\n"
             "  pip install matplotlib\n"
             "  or\n"
             "  conda install matplotlib"
         )
+    
+    # Mask NaN/inf on top of any mask the input already has (float32 is
+    # plenty for this)
+    data = np.ma.masked_invalid(np.ma.array(array, dtype=np.float32, copy=False))
+    valid = data.compressed()
+    
+    # Scale the valid values to palette indices. With no valid values
+    # there is no range, and everything is transparent anyway
+    vmin, vmax = (valid.min(), valid.max()) if valid.size else (0.0, 0.0)
+    scale = (_INVALID_INDEX - 1) / (vmax - vmin) if vmax > vmin else 0
+    indexed = ((data - vmin) * scale).round().filled(_INVALID_INDEX)
+    indexed = np.ascontiguousarray(np.flipud(indexed.astype(np.uint8)))
+    
+    # Wrap the index bytes as a palette image without copying them
+    height, width = indexed.shape
+    img = Image.frombuffer('P', (width, height), indexed, 'raw', 'P', 0, 1)
+    img.putpalette(palette)
+    
+    # Fast zlib settings, no optimize pass
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', compress_level=1, optimize=False,
+             transparency=_INVALID_INDEX)
+    
+    return _data_uri('image/png', buffer.getbuffer())
 
 
 def create_coastline_background(width: int = 800, height: int = 600, 
@@ -169,12 +465,15 @@ def create_coastline_background(width: int = 800, height: int = 600,
     """
     Create a simple coastline background image.
     
+    Images are cached in memory per argument set, so re-running an
+    example with the same coastlines skips the drawing and PNG encoding.
+    
     Args:
         width: Image width in pixels
         height: Image height in pixels
         coastlines: List of (x_coords, y_coords) tuples for each coastline polygon
-        bg_color: Ocean/background color
-        land_color: Land/coastline color
+        bg_color: Ocean/background color (color string or RGB tuple)
+        land_color: Land/coastline color (color string or RGB tuple)
     
     Returns:
         Base64 data URI string
@@ -193,32 +492,61 @@ def create_coastline_background(width: int = 800, height: int = 600,
             ...
         )
     """
-    try:
-        from PIL import Image, ImageDraw
-        
-        # Create image
-        img = Image.new('RGB', (width, height), bg_color)
+    # Polygons as nested tuples, so they can be part of the cache key
+    coastline_key = tuple((tuple(x_coords), tuple(y_coords))
+                          for x_coords, y_coords in coastlines or ())
+    return _coastline_background(width, height, coastline_key,
+                                 _rgb(bg_color), _rgb(land_color))
+
+
+def _rgb(color) -> tuple:
+    """(r, g, b) for a color string (hex or name) or an RGB(A) tuple."""
+    if isinstance(color, str):
+        color = ImageColor.getrgb(color)
+    return tuple(color)[:3]
+
+
+@functools.lru_cache(maxsize=8)
+def _coastline_background(width: int, height: int, coastlines: tuple,
+                          bg_color: tuple, land_color: tuple) -> str:
+    """create_coastline_background with hashable arguments (cached)."""
+    # Palettized image: 0 = ocean, 1 = land, 2 = coast outline. Three
+    # colors need one byte per pixel instead of three.
+    if coastlines and aggdraw is not None:
+        # aggdraw cannot draw into 'P' images, so draw the palette
+        # indices as gray levels into an 'L' image (no antialiasing, so
+        # no in-between values) and reinterpret it as 'P'
+        indices = Image.new('L', (width, height), 0)
+        draw = aggdraw.Draw(indices)
+        draw.setantialias(False)
+        pen = aggdraw.Pen((2, 2, 2), 1)
+        brush = aggdraw.Brush((1, 1, 1))
+        for x_coords, y_coords in coastlines:
+            flat = [v for point in zip(x_coords, y_coords) for v in point]
+            draw.polygon(flat, pen, brush)
+        draw.flush()
+        img = indices.convert('P')
+    else:
+        img = Image.new('P', (width, height), 0)
         draw = ImageDraw.Draw(img)
         
         # Draw coastlines
         if coastlines:
             for x_coords, y_coords in coastlines:
                 polygon = list(zip(x_coords, y_coords))
-                draw.polygon(polygon, fill=land_color, outline='#2d5016')
-        
-        # Convert to base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        img_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-        return f"data:image/png;base64,{img_base64}"
+                draw.polygon(polygon, fill=1, outline=2)
     
-    except ImportError:
-        raise ImportError(
-            "create_coastline_background requires Pillow. Install with:\n"
-            "  pip install pillow"
-        )
+    img.putpalette([
+        *bg_color,
+        *land_color,
+        *_rgb('#2d5016'),
+    ])
+    
+    # Convert to base64 (flat colors compress well even at level 1)
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', compress_level=1, optimize=False)
+    
+    return _data_uri('image/png', buffer.getbuffer())
 
 
 # Convenience function combining everything
@@ -251,27 +579,44 @@ def prepare_background(source, **kwargs) -> str:
         # From coastlines
         bg = prepare_background([island1, island2])
     """
-    import numpy as np
-    from bokeh.models import Plot, LayoutDOM
+    # Exact-type lookup first for the common plain cases
+    handler = _BACKGROUND_HANDLERS.get(type(source))
+    if handler is not None:
+        return handler(source, **kwargs)
     
-    # Bokeh plot
+    # Bokeh plot (redrawn with PIL when simple enough, else via selenium)
     if isinstance(source, (Plot, LayoutDOM)):
-        return bokeh_to_base64(source, **kwargs)
-    
-    # File path
-    elif isinstance(source, str) and '.' in source:
-        return image_file_to_base64(source)
-    
-    # Numpy array
-    elif isinstance(source, np.ndarray):
-        return numpy_array_to_base64(source, **kwargs)
+        return bokeh_to_base64_fast(source, **kwargs)
     
-    # Coastline polygons
-    elif isinstance(source, list):
-        return create_coastline_background(coastlines=source, **kwargs)
+    # Subclasses of the plain types
+    for source_type, handler in _BACKGROUND_HANDLERS.items():
+        if isinstance(source, source_type):
+            return handler(source, **kwargs)
     
-    else:
-        raise ValueError(
-            f"Unsupported source type: {type(source)}. "
-            "Expected Bokeh plot, file path, numpy array, or coastline list."
-        )
+    raise _unsupported_source(source)
+
+
+def _unsupported_source(source) -> ValueError:
+    return ValueError(
+        f"Unsupported source type: {type(source)}. "
+        "Expected Bokeh plot, file path, numpy array, or coastline list."
+    )
+
+
+def _background_from_path(source: str, **kwargs) -> str:
+    # File path
+    if '.' not in source:
+        raise _unsupported_source(source)
+    return image_file_to_base64(source)
+
+
+def _background_from_coastlines(source: list, **kwargs) -> str:
+    return create_coastline_background(coastlines=source, **kwargs)
+
+
+# prepare_background handlers, keyed on the exact source type
+_BACKGROUND_HANDLERS = {
+    str: _background_from_path,
+    np.ndarray: numpy_array_to_base64,
+    list: _background_from_coastlines,
+}
@@ -0,0 +1,174 @@
+"""
+Bokeh widget panels for driving flow field models from the browser
+"""
+
+from bokeh.layouts import column, row
+from bokeh.models import (Button, CheckboxGroup, ColorPicker, CustomJS, Div, InlineStyleSheet,
+                          Select, Slider)
+
+# Slider controls: flow property -> (title, start, end, step). The particle
+# count range can be overridden per panel by make_controls
+SLIDERS = {
+    'particle_count': ("Particle Count", 1000, 15000, 1000),
+    'particle_size': ("Particle Size", 1, 6, 0.5),
+    'flow_strength': ("Flow Strength", 0.5, 10, 0.5),
+    'animation_speed': ("Animation Speed", 0.1, 3, 0.1),
+    'background_alpha': ("Background Opacity", 0, 1, 0.1),
+}
+
+# Widget groups of a panel, by widget name: slider properties,
+# 'color_scheme', 'background_color', 'options' (checkboxes) and 'play'.
+# Only the widgets named here are created, and sliders only for properties
+# the flow model has (FlowFieldInteractive has no background_alpha)
+COLUMNS = (
+    ('particle_count', 'particle_size'),
+    ('flow_strength', 'animation_speed'),
+    ('color_scheme', 'background_alpha', 'options', 'play'),
+)
+
+# Styles for the title and controls header Divs, referenced by class name
+# instead of repeating inline styles in every Div
+TITLE_CSS = """
+.pattern-title {
+    font-family: system-ui; color: #333; margin: 30px 0 10px 0;
+    font-size: 24px; font-weight: 600;
+}
+.section-title {
+    font-family: system-ui; margin: 30px 0 15px 0; padding: 15px;
+    background: white; border-radius: 8px; border-left: 5px solid #667eea;
+}
+.section-title h2 { margin: 0 0 8px 0; color: #333; font-size: 22px; font-weight: 600; }
+.section-title p { margin: 0; color: #666; font-size: 14px; line-height: 1.6; }
+.controls-header {
+    font-family: system-ui; padding: 12px;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white; border-radius: 8px 8px 0 0; margin-top: 20px;
+}
+.controls-header h3 { margin: 0; font-size: 16px; font-weight: 600; }
+"""
+
+CONTROLS_HEADER_HTML = """
+<div class="controls-header"><h3>⚙️ {title} Controls</h3></div>
+"""
+
+
+def title_styles():
+    """
+    Stylesheet model with TITLE_CSS for a title or header Div.
+
+    A new model on every call: Bokeh models belong to a single document,
+    so one module-level stylesheet would break a second save() or server
+    session.
+    """
+    return InlineStyleSheet(css=TITLE_CSS)
+
+
+def make_controls(flows, width, *, color_options, sliders=SLIDERS, columns=COLUMNS,
+                  particle_range=None, title=None, vertical=False, widget_width=260):
+    """
+    Create a panel of Bokeh widgets that drive one or more flow fields.
+
+    Args:
+        flows: Flow field model, or a list of them driven together. Widgets
+            start from the first flow's settings
+        width: Width of the panel header in pixels
+        color_options: Color scheme names offered by the selector
+        sliders: Slider table, flow property -> (title, start, end, step)
+        columns: Widget groups of the panel (see COLUMNS)
+        particle_range: (start, end) of the particle count slider, overriding
+            the slider table
+        title: Header text ("<title> Controls"); no header when None
+        vertical: Stack the widget groups in a column (for a panel beside
+            the plot) instead of a row (for a panel below it)
+        widget_width: Width of each widget in pixels
+
+    Returns:
+        Bokeh layout with the controls
+    """
+    if not isinstance(flows, (list, tuple)):
+        flows = [flows]
+    flows = list(flows)
+    first = flows[0]
+    names = {name for group in columns for name in group}
+    widgets = {}
+
+    # One callback serves every value widget: each widget is named after
+    # the flow property it sets
+    set_property = CustomJS(args=dict(flows=flows), code="""
+        for (const f of flows) f[cb_obj.name] = cb_obj.value;
+    """)
+
+    # Sliders
+    properties = first.properties()
+    for prop, (label, start, end, step) in sliders.items():
+        if prop not in names or prop not in properties:
+            continue
+        if prop == 'particle_count' and particle_range is not None:
+            start, end = particle_range
+        widgets[prop] = Slider(start=start, end=end, value=getattr(first, prop), step=step,
+                               title=label, name=prop, width=widget_width)
+        widgets[prop].js_on_change('value', set_property)
+
+    # Visual controls
+    if 'color_scheme' in names:
+        widgets['color_scheme'] = Select(
+            title="Color Scheme", value=first.color_scheme,
+            options=list(color_options),
+            name='color_scheme', width=widget_width
+        )
+        widgets['color_scheme'].js_on_change('value', set_property)
+
+    if 'background_color' in names:
+        widgets['background_color'] = ColorPicker(
+            title="Background Color", color=first.background_color, width=widget_width
+        )
+        widgets['background_color'].js_on_change('color', CustomJS(
+            args=dict(flows=flows),
+            code="for (const f of flows) f.background_color = cb_obj.color;"
+        ))
+
+    # Options (particle trails only for models that draw them)
+    if 'options' in names:
+        labels = ["Show Flow Vectors"]
+        code = "f.show_vectors = cb_obj.active.includes(0);"
+        active = []
+        if 'particle_trail' in properties:
+            labels.append("Particle Trails")
+            code += " f.particle_trail = cb_obj.active.includes(1);"
+            active = [1] if first.particle_trail else []
+        widgets['options'] = CheckboxGroup(labels=labels, active=active, width=widget_width)
+        widgets['options'].js_on_change('active', CustomJS(
+            args=dict(flows=flows), code=f"for (const f of flows) {{ {code} }}"
+        ))
+
+    # Play/Pause
+    if 'play' in names:
+        play_button = Button(label="⏸ Pause", button_type="success", width=widget_width)
+        play_button.js_on_click(CustomJS(args=dict(flows=flows, b=play_button), code="""
+            const animate = !flows[0].animate;
+            for (const f of flows) f.animate = animate;
+            b.label = animate ? '⏸ Pause' : '▶ Play';
+            b.button_type = animate ? 'success' : 'warning';
+        """))
+        widgets['play'] = play_button
+
+    # Layout
+    layout = column if vertical else row
+    panel_items = [Div(text="", width=30)]
+    for group in columns:
+        panel_items.append(column(*(widgets[name] for name in group if name in widgets),
+                                  width=widget_width))
+        panel_items.append(Div(text="", width=30))
+    controls_panel = layout(
+        *panel_items,
+        sizing_mode="fixed",
+        styles={'background': '#f8f9fa', 'padding': '20px',
+                'border-radius': '0 0 8px 8px'}
+    )
+
+    if title is None:
+        return column(controls_panel, sizing_mode="fixed")
+
+    controls_header = Div(text=CONTROLS_HEADER_HTML.format(title=title), width=width,
+                          stylesheets=[title_styles()])
+    return column(controls_header, controls_panel, sizing_mode="fixed")
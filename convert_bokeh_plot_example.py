@@ -10,8 +10,9 @@ from bokeh.layouts import column
 from bokeh.models import Div, Slider, Select, CheckboxGroup
 from bokeh.models import CustomJS
 from flowfield_with_background import FlowFieldWithBackground
-from background_utils import create_coastline_background
-import math
+from background_utils import create_coastline_background, prepare_background
+from flow_kernels import quantize_flow
+import numpy as np
 
 # ============================================
 # YOUR EXISTING BOKEH PLOT CODE
@@ -47,7 +48,7 @@ def create_your_bokeh_plot():
     coast2_x = [450, 550, 600, 580, 480, 450]
     coast2_y = [300, 280, 350, 420, 400, 300]
     p.patch(coast2_x, coast2_y, fill_color='#3d5a3d', 
-            fill_alpha=0.8, line_color='#2d4a2d', line_width=2]
+            fill_alpha=0.8, line_color='#2d4a2d', line_width=2)
     
     # Bathymetry contours
     for depth in [50, 100, 150, 200]:
@@ -89,10 +90,9 @@ def method1_manual():
 def method2_export_bokeh():
     """
     Export your Bokeh plot directly to an image.
-    Requires: pip install pillow selenium
+    Simple plots (patches, circles) are redrawn with PIL; anything
+    else requires: pip install pillow selenium
     """
-    from background_utils import prepare_background
-    
     p, width, height = create_your_bokeh_plot()
     
     try:
@@ -116,58 +116,55 @@ def method2_export_bokeh():
 # GENERATE FLOW DATA
 # ============================================
 
-def generate_flow_around_obstacles(width, height):
-    """Generate flow that goes around the coastlines"""
+def generate_flow_around_obstacles(width, height, obstacles=None):
+    """
+    Generate flow that goes around the coastlines.
+    
+    obstacles is an (n, 3) array-like of (x, y, radius) rows; by default
+    the two islands drawn by the background methods above. Any number of
+    obstacles is handled in one broadcast pass over the grid.
+    """
     grid_size = 35
     
-    x_coords = []
-    y_coords = []
-    dx_values = []
-    dy_values = []
-    magnitudes = []
+    # Grid positions in pixels (i -> x, j -> y)
+    i, j = np.meshgrid(np.arange(grid_size + 1), np.arange(grid_size + 1),
+                       indexing='ij')
+    x = i / grid_size * width
+    y = j / grid_size * height
+    
+    # Base flow (left to right)
+    dx_base = np.ones_like(x)
+    dy_base = 0.1 * np.sin(y / height * 2 * np.pi)
     
     # Obstacle centers (matching coastline locations)
-    obstacles = [
-        (160, 180, 80),   # (x, y, radius)
-        (520, 350, 100),
-    ]
+    if obstacles is None:
+        obstacles = [
+            (160, 180, 80),   # (x, y, radius)
+            (520, 350, 100),
+        ]
+    obstacles = np.asarray(obstacles, dtype=float).reshape(-1, 3)
+    
+    # As (n_obstacles, 1, 1) arrays, so every obstacle is evaluated against
+    # the whole grid at once
+    obs_x, obs_y, obs_r = obstacles.T[:, :, None, None]
+    
+    dx_obs = x - obs_x
+    dy_obs = y - obs_y
+    dist = np.hypot(dx_obs, dy_obs)
     
-    for i in range(grid_size + 1):
-        for j in range(grid_size + 1):
-            x = (i / grid_size) * width
-            y = (j / grid_size) * height
-            
-            # Base flow (left to right)
-            dx_base = 1.0
-            dy_base = 0.1 * math.sin(y / height * math.pi * 2)
-            
-            # Deflection around obstacles
-            dx_deflect = 0
-            dy_deflect = 0
-            
-            for obs_x, obs_y, obs_r in obstacles:
-                dx_obs = x - obs_x
-                dy_obs = y - obs_y
-                dist = math.sqrt(dx_obs**2 + dy_obs**2)
-                
-                if dist < obs_r * 2:  # Influence zone
-                    strength = max(0, 1 - dist / (obs_r * 2))
-                    # Push flow around obstacle
-                    if dist > 0:
-                        dx_deflect += (dx_obs / dist) * strength * 0.5
-                        dy_deflect += (dy_obs / dist) * strength * 0.5
-            
-            dx = dx_base + dx_deflect
-            dy = dy_base + dy_deflect
-            magnitude = math.sqrt(dx**2 + dy**2)
-            
-            x_coords.append(x)
-            y_coords.append(y)
-            dx_values.append(dx)
-            dy_values.append(dy)
-            magnitudes.append(magnitude)
+    # Influence zone, pushing flow around the obstacle
+    strength = np.where(dist < obs_r * 2,
+                        np.maximum(0, 1 - dist / (obs_r * 2)), 0)
+    safe_dist = np.where(dist > 0, dist, 1)
+    dx_deflect = (dx_obs / safe_dist * strength * 0.5).sum(axis=0)
+    dy_deflect = (dy_obs / safe_dist * strength * 0.5).sum(axis=0)
     
-    return x_coords, y_coords, dx_values, dy_values, magnitudes
+    dx = dx_base + dx_deflect
+    dy = dy_base + dy_deflect
+    
+    # float32 is plenty for rendering and halves the binary payload
+    return tuple(arr.ravel().astype(np.float32)
+                 for arr in (x, y, dx, dy))
 
 
 # ============================================
@@ -180,7 +177,9 @@ output_file("convert_bokeh_plot_example.html")
 bg_image, width, height = method2_export_bokeh()
 
 # Generate flow data
-x, y, dx, dy, mag = generate_flow_around_obstacles(width, height)
+x, y, dx, dy = generate_flow_around_obstacles(width, height)
+
+dx, dy, scale = quantize_flow(dx, dy)
 
 # Create flow field with background
 flow = FlowFieldWithBackground(
@@ -190,7 +189,7 @@ flow = FlowFieldWithBackground(
     y_coords=y,
     dx_values=dx,
     dy_values=dy,
-    magnitudes=mag,
+    value_scale=scale,
     
     # Particle settings
     particle_count=4000,
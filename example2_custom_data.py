@@ -7,11 +7,12 @@ Controls are implemented with Bokeh widgets and CustomJS.
 """
 
 from bokeh.plotting import output_file, save
-from bokeh.layouts import column, row
-from bokeh.models import Div, Slider, Select, CheckboxGroup, Button
-from bokeh.models import CustomJS
+from bokeh.layouts import column
+from bokeh.models import Div
 from flowfield_interactive import FlowFieldInteractive
-import math
+from controls import make_controls, title_styles
+from flow_kernels import quantize_flow
+import numpy as np
 
 # ============================================
 # EXAMPLE 1: Mathematical Flow Field
@@ -23,37 +24,26 @@ def create_mathematical_flow():
     height = 600
     grid_size = 40
     
-    x_coords = []
-    y_coords = []
-    dx_values = []
-    dy_values = []
-    magnitudes = []
+    # Grid positions in pixels (x varies along the first axis)
+    xs = np.linspace(0.0, width, grid_size + 1)
+    ys = np.linspace(0.0, height, grid_size + 1)
+    x, y = np.meshgrid(xs, ys, indexing='ij')
     
-    for i in range(grid_size + 1):
-        for j in range(grid_size + 1):
-            x = (i / grid_size) * width
-            y = (j / grid_size) * height
-            
-            # YOUR CUSTOM FLOW FUNCTION HERE
-            # Example: velocity field from a potential function
-            # φ(x,y) = cos(2πx/width) * sin(2πy/height)
-            # u = -∂φ/∂y,  v = ∂φ/∂x
-            
-            nx = x / width * 2 * math.pi
-            ny = y / height * 2 * math.pi
-            
-            dx = -math.cos(nx) * math.cos(ny)  # -∂φ/∂y
-            dy = -math.sin(nx) * math.sin(ny)  # ∂φ/∂x
-            
-            magnitude = math.sqrt(dx**2 + dy**2)
-            
-            x_coords.append(x)
-            y_coords.append(y)
-            dx_values.append(dx)
-            dy_values.append(dy)
-            magnitudes.append(magnitude)
+    # YOUR CUSTOM FLOW FUNCTION HERE
+    # Example: velocity field from a potential function
+    # φ(x,y) = cos(2πx/width) * sin(2πy/height)
+    # u = -∂φ/∂y,  v = ∂φ/∂x
     
-    return x_coords, y_coords, dx_values, dy_values, magnitudes
+    # Separable in x and y: evaluate the trig on the 1-D axes only and
+    # combine with outer products
+    nx = xs / width * 2 * np.pi
+    ny = ys / height * 2 * np.pi
+    
+    dx = -np.outer(np.cos(nx), np.cos(ny))  # -∂φ/∂y
+    dy = -np.outer(np.sin(nx), np.sin(ny))  # ∂φ/∂x
+    
+    return tuple(arr.ravel().astype(np.float32, copy=False)
+                 for arr in (x, y, dx, dy))
 
 # ============================================
 # EXAMPLE 2: Simulated Wind Data
@@ -65,39 +55,27 @@ def create_wind_field():
     height = 600
     grid_size = 30
     
-    x_coords = []
-    y_coords = []
-    dx_values = []
-    dy_values = []
-    magnitudes = []
+    # Grid positions in pixels (x varies along the first axis)
+    xs = np.linspace(0.0, width, grid_size + 1)
+    ys = np.linspace(0.0, height, grid_size + 1)
+    x, y = np.meshgrid(xs, ys, indexing='ij')
+    
+    # Latitude factor (0 = south, 1 = north), one value per y position
+    lat_factor = ys / height
+    
+    # Base westerly wind (stronger in middle latitudes), broadcast along x
+    base_u = 1.5 * np.sin(lat_factor * np.pi)[None, :]
+    base_v = 0.3 * np.cos(lat_factor * np.pi * 2)[None, :]
     
-    for i in range(grid_size + 1):
-        for j in range(grid_size + 1):
-            x = (i / grid_size) * width
-            y = (j / grid_size) * height
-            
-            # Latitude factor (0 = south, 1 = north)
-            lat_factor = y / height
-            
-            # Base westerly wind (stronger in middle latitudes)
-            base_u = 1.5 * math.sin(lat_factor * math.pi)
-            base_v = 0.3 * math.cos(lat_factor * math.pi * 2)
-            
-            # Add some "turbulence"
-            turb_u = 0.2 * math.sin(x / 50 + y / 30)
-            turb_v = 0.2 * math.cos(x / 30 + y / 50)
-            
-            dx = base_u + turb_u
-            dy = base_v + turb_v
-            magnitude = math.sqrt(dx**2 + dy**2)
-            
-            x_coords.append(x)
-            y_coords.append(y)
-            dx_values.append(dx)
-            dy_values.append(dy)
-            magnitudes.append(magnitude)
+    # Add some "turbulence"
+    turb_u = 0.2 * np.sin(x / 50 + y / 30)
+    turb_v = 0.2 * np.cos(x / 30 + y / 50)
     
-    return x_coords, y_coords, dx_values, dy_values, magnitudes
+    dx = base_u + turb_u
+    dy = base_v + turb_v
+    
+    return tuple(arr.ravel().astype(np.float32, copy=False)
+                 for arr in (x, y, dx, dy))
 
 # ============================================
 # EXAMPLE 3: Ocean Current Simulation
@@ -109,131 +87,97 @@ def create_ocean_current_field():
     height = 600
     grid_size = 35
     
-    x_coords = []
-    y_coords = []
-    dx_values = []
-    dy_values = []
-    magnitudes = []
-    
     center_x = width * 0.6
     center_y = height * 0.5
     
-    for i in range(grid_size + 1):
-        for j in range(grid_size + 1):
-            x = (i / grid_size) * width
-            y = (j / grid_size) * height
-            
-            # Main gyre
-            dx_c = x - center_x
-            dy_c = y - center_y
-            dist = math.sqrt(dx_c**2 + dy_c**2)
-            
-            if dist > 0:
-                strength = math.exp(-dist / 150)
-                gyre_u = -dy_c / dist * strength
-                gyre_v = dx_c / dist * strength
-            else:
-                gyre_u, gyre_v = 0, 0
-            
-            # Coastal current
-            coastal_dist = abs(x - 50)
-            if coastal_dist < 80:
-                coastal_strength = (1 - coastal_dist / 80) * 0.8
-                coastal_u = 0
-                coastal_v = coastal_strength
-            else:
-                coastal_u, coastal_v = 0, 0
-            
-            # Small eddy
-            eddy_x, eddy_y = width * 0.3, height * 0.7
-            dx_e, dy_e = x - eddy_x, y - eddy_y
-            dist_e = math.sqrt(dx_e**2 + dy_e**2)
-            
-            if dist_e > 0 and dist_e < 80:
-                eddy_strength = (1 - dist_e / 80) * 0.4
-                eddy_u = dy_e / dist_e * eddy_strength
-                eddy_v = -dx_e / dist_e * eddy_strength
-            else:
-                eddy_u, eddy_v = 0, 0
-            
-            # Combine
-            dx = gyre_u + coastal_u + eddy_u
-            dy = gyre_v + coastal_v + eddy_v
-            magnitude = math.sqrt(dx**2 + dy**2)
-            
-            x_coords.append(x)
-            y_coords.append(y)
-            dx_values.append(dx)
-            dy_values.append(dy)
-            magnitudes.append(magnitude)
-    
-    return x_coords, y_coords, dx_values, dy_values, magnitudes
+    # Grid positions in pixels (x varies along the first axis)
+    xs = np.linspace(0.0, width, grid_size + 1)
+    ys = np.linspace(0.0, height, grid_size + 1)
+    x, y = np.meshgrid(xs, ys, indexing='ij')
+    
+    # Main gyre
+    dx_c = x - center_x
+    dy_c = y - center_y
+    # Sum of squares built and rooted in place (one temporary). The grid is
+    # bounded, so this is safe and cheaper than np.hypot
+    dist = dx_c * dx_c
+    dist += dy_c * dy_c
+    np.sqrt(dist, out=dist)
+    
+    # exp(-dist / 150) / dist as a single factor (0 at the center), so
+    # each component is one multiply
+    strength = np.divide(np.exp(-dist / 150), dist, out=np.zeros_like(dist), where=dist > 0)
+    gyre_u = -dy_c * strength
+    gyre_v = dx_c * strength
+    
+    # Coastal current (northward only). It depends on x alone, so work on
+    # the x axis and broadcast along y
+    coastal_dist = np.abs(xs - 50)
+    coastal_v = np.where(coastal_dist < 80, (1 - coastal_dist / 80) * 0.8, 0)[:, None]
+    
+    # Small eddy, 80 px radius. Only the block of grid points inside its
+    # bounding box is looked at, and only the points inside the circle
+    # take a square root.
+    eddy_x, eddy_y, eddy_r = width * 0.3, height * 0.7, 80
+    eddy_u = np.zeros_like(x)
+    eddy_v = np.zeros_like(x)
+    
+    box = (slice(*np.searchsorted(xs, [eddy_x - eddy_r, eddy_x + eddy_r])),
+           slice(*np.searchsorted(ys, [eddy_y - eddy_r, eddy_y + eddy_r])))
+    dx_e = x[box] - eddy_x
+    dy_e = y[box] - eddy_y
+    dist_e_sq = dx_e * dx_e + dy_e * dy_e
+    
+    in_eddy = (dist_e_sq > 0) & (dist_e_sq < eddy_r * eddy_r)
+    dist_e = np.sqrt(dist_e_sq[in_eddy])
+    eddy_strength = (1 - dist_e / eddy_r) * 0.4 / dist_e
+    eddy_u[box][in_eddy] = dy_e[in_eddy] * eddy_strength
+    eddy_v[box][in_eddy] = -dx_e[in_eddy] * eddy_strength
+    
+    # Combine
+    dx = gyre_u + eddy_u
+    dy = gyre_v + coastal_v + eddy_v
+    
+    return tuple(arr.ravel().astype(np.float32, copy=False)
+                 for arr in (x, y, dx, dy))
 
 # ============================================
 # HELPER: CREATE COMPACT CONTROLS
 # ============================================
 
+# Color schemes offered by the controls
+COLOR_SCHEMES = ['viridis', 'turbo', 'plasma', 'inferno', 'cividis', 'ocean', 'rainbow']
+
+# Slider controls: flow property -> (title, start, end, step)
+COMPACT_SLIDERS = {
+    'particle_count': ("Particles", 500, 6000, 500),
+    'flow_strength': ("Strength", 0.5, 8, 0.5),
+    'animation_speed': ("Speed", 0.1, 2.5, 0.1),
+}
+
+# Control panel layout, by widget name (see controls.COLUMNS)
+COMPACT_COLUMNS = (
+    ('particle_count', 'flow_strength'),
+    ('animation_speed', 'color_scheme'),
+    ('options', 'play'),
+)
+
+TITLE_HTML = """
+<div class="section-title">
+    <h2>{title}</h2>
+    <p>{subtitle}</p>
+</div>
+"""
+
+def create_title(title, subtitle):
+    """Create a section title Div using the shared styles"""
+    return Div(text=TITLE_HTML.format(title=title, subtitle=subtitle),
+               width=800, stylesheets=[title_styles()])
+
 def create_compact_controls(flow, title):
     """Create a compact control panel for a flow visualization"""
-    
-    # Sliders
-    particle_slider = Slider(start=500, end=6000, value=flow.particle_count, 
-                            step=500, title="Particles", width=220)
-    particle_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.particle_count = cb_obj.value;"))
-    
-    strength_slider = Slider(start=0.5, end=8, value=flow.flow_strength, 
-                            step=0.5, title="Strength", width=220)
-    strength_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.flow_strength = cb_obj.value;"))
-    
-    speed_slider = Slider(start=0.1, end=2.5, value=flow.animation_speed, 
-                         step=0.1, title="Speed", width=220)
-    speed_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.animation_speed = cb_obj.value;"))
-    
-    # Color scheme
-    color_select = Select(title="Colors", value=flow.color_scheme,
-                         options=['viridis', 'turbo', 'plasma', 'inferno', 
-                                 'cividis', 'ocean', 'rainbow'], width=220)
-    color_select.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.color_scheme = cb_obj.value;"))
-    
-    # Checkboxes
-    options_checks = CheckboxGroup(labels=["Show Vectors"], active=[], width=220)
-    options_checks.js_on_change('active', CustomJS(
-        args=dict(f=flow), code="f.show_vectors = cb_obj.active.includes(0);"))
-    
-    # Play/pause
-    play_btn = Button(label="⏸ Pause", button_type="success", width=220)
-    play_btn.js_on_click(CustomJS(args=dict(f=flow, b=play_btn), code="""
-        f.animate = !f.animate;
-        b.label = f.animate ? '⏸ Pause' : '▶ Play';
-        b.button_type = f.animate ? 'success' : 'warning';
-    """))
-    
-    # Layout
-    controls_header = Div(text=f"""
-    <div style="font-family: system-ui; padding: 12px; 
-         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-         color: white; border-radius: 8px 8px 0 0; margin-top: 15px;">
-        <h4 style="margin: 0; font-size: 15px; font-weight: 600;">⚙️ {title} Controls</h4>
-    </div>
-    """, width=800)
-    
-    controls_panel = row(
-        Div(text="", width=20),
-        column(particle_slider, strength_slider, width=220),
-        Div(text="", width=20),
-        column(speed_slider, color_select, width=220),
-        Div(text="", width=20),
-        column(options_checks, play_btn, width=220),
-        sizing_mode="fixed",
-        styles={'background': '#f8f9fa', 'padding': '15px', 
-                'border-radius': '0 0 8px 8px'}
-    )
-    
-    return column(controls_header, controls_panel, sizing_mode="fixed")
+    return make_controls(flow, 800, color_options=COLOR_SCHEMES, sliders=COMPACT_SLIDERS,
+                         columns=COMPACT_COLUMNS, title=title, widget_width=220)
 
 # ============================================
 # CREATE VISUALIZATIONS
@@ -243,74 +187,56 @@ output_file("example2_custom_data.html")
 
 
 # Example 1: Mathematical
-x1, y1, dx1, dy1, mag1 = create_mathematical_flow()
+x1, y1, dx1, dy1 = create_mathematical_flow()
+dx1, dy1, scale1 = quantize_flow(dx1, dy1)  # int8 vectors
 flow1 = FlowFieldInteractive(
     width=800, height=600,
     x_coords=x1, y_coords=y1,
-    dx_values=dx1, dy_values=dy1, magnitudes=mag1,
+    dx_values=dx1, dy_values=dy1, value_scale=scale1,
     particle_count=4000, particle_size=2, flow_strength=3.0,
     background_color='#0a0a0a', color_scheme='viridis'
 )
 
-title1 = Div(text="""
-<div style="font-family: system-ui; margin: 30px 0 15px 0; padding: 15px; 
-     background: white; border-radius: 8px; border-left: 5px solid #667eea;">
-    <h2 style="margin: 0 0 8px 0; color: #333; font-size: 22px; font-weight: 600;">
-        1️⃣ Mathematical Flow Field
-    </h2>
-    <p style="margin: 0; color: #666; font-size: 14px; line-height: 1.6;">
-        Created from: φ(x,y) = cos(2πx) × sin(2πy) → <strong>u = -∂φ/∂y</strong>, <strong>v = ∂φ/∂x</strong>
-    </p>
-</div>
-""", width=800)
+title1 = create_title(
+    "1️⃣ Mathematical Flow Field",
+    "Created from: φ(x,y) = cos(2πx) × sin(2πy) → <strong>u = -∂φ/∂y</strong>, <strong>v = ∂φ/∂x</strong>"
+)
 
 controls1 = create_compact_controls(flow1, "Mathematical Flow")
 
 # Example 2: Wind
-x2, y2, dx2, dy2, mag2 = create_wind_field()
+x2, y2, dx2, dy2 = create_wind_field()
+dx2, dy2, scale2 = quantize_flow(dx2, dy2)  # int8 vectors
 flow2 = FlowFieldInteractive(
     width=800, height=600,
     x_coords=x2, y_coords=y2,
-    dx_values=dx2, dy_values=dy2, magnitudes=mag2,
+    dx_values=dx2, dy_values=dy2, value_scale=scale2,
     particle_count=3500, particle_size=2.5, flow_strength=2.5,
     background_color='#001a33', color_scheme='turbo'
 )
 
-title2 = Div(text="""
-<div style="font-family: system-ui; margin: 30px 0 15px 0; padding: 15px; 
-     background: white; border-radius: 8px; border-left: 5px solid #667eea;">
-    <h2 style="margin: 0 0 8px 0; color: #333; font-size: 22px; font-weight: 600;">
-        2️⃣ Simulated Wind Field
-    </h2>
-    <p style="margin: 0; color: #666; font-size: 14px; line-height: 1.6;">
-        Atmospheric pattern with westerly jet + turbulence (like OpenWeatherMap data)
-    </p>
-</div>
-""", width=800)
+title2 = create_title(
+    "2️⃣ Simulated Wind Field",
+    "Atmospheric pattern with westerly jet + turbulence (like OpenWeatherMap data)"
+)
 
 controls2 = create_compact_controls(flow2, "Wind Field")
 
 # Example 3: Ocean
-x3, y3, dx3, dy3, mag3 = create_ocean_current_field()
+x3, y3, dx3, dy3 = create_ocean_current_field()
+dx3, dy3, scale3 = quantize_flow(dx3, dy3)  # int8 vectors
 flow3 = FlowFieldInteractive(
     width=800, height=600,
     x_coords=x3, y_coords=y3,
-    dx_values=dx3, dy_values=dy3, magnitudes=mag3,
+    dx_values=dx3, dy_values=dy3, value_scale=scale3,
     particle_count=4500, particle_size=2, flow_strength=3.5,
     background_color='#001a1a', color_scheme='ocean'
 )
 
-title3 = Div(text="""
-<div style="font-family: system-ui; margin: 30px 0 15px 0; padding: 15px; 
-     background: white; border-radius: 8px; border-left: 5px solid #667eea;">
-    <h2 style="margin: 0 0 8px 0; color: #333; font-size: 22px; font-weight: 600;">
-        3️⃣ Ocean Current Simulation
-    </h2>
-    <p style="margin: 0; color: #666; font-size: 14px; line-height: 1.6;">
-        Complex circulation: main gyre + coastal current + mesoscale eddy
-    </p>
-</div>
-""", width=800)
+title3 = create_title(
+    "3️⃣ Ocean Current Simulation",
+    "Complex circulation: main gyre + coastal current + mesoscale eddy"
+)
 
 controls3 = create_compact_controls(flow3, "Ocean Currents")
 
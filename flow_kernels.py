@@ -0,0 +1,215 @@
+"""
+Compiled kernels for evaluating flow patterns on a grid, plus a helper for
+quantizing gridded flow data.
+
+Numba is optional (pip install numba). With it, patterns are evaluated by
+a parallel JIT-compiled loop; without it, the same patterns are computed
+with plain NumPy array expressions.
+"""
+
+import math
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+    
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the function uncompiled."""
+        return lambda fn: fn
+
+
+# Pattern names understood by pattern_flow, and their kernel ids
+PATTERN_IDS = {
+    'spiral': 0,
+    'vortex': 1,
+    'sink': 2,
+    'source': 3,
+    'wave': 4,
+    'double_gyre': 5,
+}
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _pattern_kernel(x, y, width, height, pattern_id, out_dx, out_dy):
+    # Explicit scalar loop (no whole-array expressions) so LLVM can
+    # vectorize it and prange can split it across threads. pattern_id is
+    # loop-invariant, so LLVM unswitches the branches out of the loop.
+    cx = width / 2
+    cy = height / 2
+    for k in prange(x.size):
+        if pattern_id == 4:
+            # Wavy horizontal flow
+            dx = 0.8
+            dy = 0.3 * math.sin(x[k] / width * math.pi * 4)
+        elif pattern_id == 5:
+            # Two counter-rotating gyres
+            nx = x[k] / width * math.pi
+            ny = y[k] / height * math.pi
+            dx = -math.sin(nx) * math.cos(ny)
+            dy = math.cos(nx) * math.sin(ny)
+        else:
+            # Radial patterns, relative to the center
+            dx_c = x[k] - cx
+            dy_c = y[k] - cy
+            dist = math.hypot(dx_c, dy_c)
+            inv_dist = 1.0 / dist if dist > 0 else 0.0
+            
+            if pattern_id == 0:
+                # Spiraling outward (70% tangential, 30% radial)
+                strength = (1.0 - math.exp(-dist / 100)) * inv_dist
+                dx = (-dy_c * 0.7 + dx_c * 0.3) * strength
+                dy = (dx_c * 0.7 + dy_c * 0.3) * strength
+            elif pattern_id == 1:
+                # Pure rotation
+                dx = -dy_c * inv_dist
+                dy = dx_c * inv_dist
+            elif pattern_id == 2:
+                # Inward flow
+                strength = (1.0 - math.exp(-dist / 200)) * inv_dist
+                dx = -dx_c * strength
+                dy = -dy_c * strength
+            else:
+                # Outward flow
+                strength = (1.0 - math.exp(-dist / 200)) * inv_dist
+                dx = dx_c * strength
+                dy = dy_c * strength
+        
+        out_dx[k] = dx
+        out_dy[k] = dy
+
+
+# NumPy versions of the _pattern_kernel branches, used when Numba is
+# missing. Each takes point arrays and returns (dx, dy).
+
+def _radial(x, y, width, height):
+    """Offsets from the center, distance and 1 / distance (0 at the center)."""
+    # The grid is bounded, so a plain sqrt is safe and cheaper than np.hypot.
+    # The sum of squares is built and rooted in place, one temporary only
+    dx_c = x - width / 2
+    dy_c = y - height / 2
+    dist = dx_c * dx_c
+    dist += dy_c * dy_c
+    np.sqrt(dist, out=dist)
+    inv_dist = np.divide(1.0, dist, out=np.zeros_like(dist), where=dist > 0)
+    return dx_c, dy_c, dist, inv_dist
+
+
+def _spiral(x, y, width, height):
+    # Spiraling outward (70% tangential, 30% radial). The unit vectors are
+    # (-dy_c, dx_c) / dist and (dx_c, dy_c) / dist, so no atan2/sin/cos
+    dx_c, dy_c, dist, inv_dist = _radial(x, y, width, height)
+    strength = (1.0 - np.exp(-dist / 100)) * inv_dist
+    return (-dy_c * 0.7 + dx_c * 0.3) * strength, (dx_c * 0.7 + dy_c * 0.3) * strength
+
+
+def _vortex(x, y, width, height):
+    # Pure rotation
+    dx_c, dy_c, _, inv_dist = _radial(x, y, width, height)
+    return -dy_c * inv_dist, dx_c * inv_dist
+
+
+def _sink(x, y, width, height):
+    # Inward flow
+    dx_c, dy_c, dist, inv_dist = _radial(x, y, width, height)
+    strength = (1 - np.exp(-dist / 200)) * inv_dist
+    return -dx_c * strength, -dy_c * strength
+
+
+def _source(x, y, width, height):
+    # Outward flow
+    dx_c, dy_c, dist, inv_dist = _radial(x, y, width, height)
+    strength = (1 - np.exp(-dist / 200)) * inv_dist
+    return dx_c * strength, dy_c * strength
+
+
+def _wave(x, y, width, height):
+    # Wavy horizontal flow (no distance needed)
+    return np.full_like(x, 0.8), 0.3 * np.sin(x / width * np.pi * 4)
+
+
+def _double_gyre(x, y, width, height):
+    # Two counter-rotating gyres, in normalized coordinates
+    nx = x / width * np.pi
+    ny = y / height * np.pi
+    return -np.sin(nx) * np.cos(ny), np.cos(nx) * np.sin(ny)
+
+
+_PATTERN_FNS = {
+    'spiral': _spiral,
+    'vortex': _vortex,
+    'sink': _sink,
+    'source': _source,
+    'wave': _wave,
+    'double_gyre': _double_gyre,
+}
+
+
+def pattern_flow(pattern_type, x, y, width, height):
+    """
+    Evaluate a named flow pattern at the given points.
+    
+    Args:
+        pattern_type: One of the keys of PATTERN_IDS; anything else gives
+            zero flow
+        x, y: Point positions in pixels (arrays of the same length)
+        width: Canvas width in pixels
+        height: Canvas height in pixels
+    
+    Returns:
+        dx, dy as 1-D arrays (float32 when compiled with Numba)
+    """
+    x = np.ravel(x)
+    y = np.ravel(y)
+    
+    if pattern_type not in PATTERN_IDS:
+        zeros = np.zeros(x.size, dtype=np.float32)
+        return zeros, zeros.copy()
+    
+    if not NUMBA_AVAILABLE:
+        return _PATTERN_FNS[pattern_type](x, y, width, height)
+    
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    y = np.ascontiguousarray(y, dtype=np.float32)
+    out_dx = np.empty_like(x)
+    out_dy = np.empty_like(x)
+    _pattern_kernel(x, y, float(width), float(height), PATTERN_IDS[pattern_type],
+                    out_dx, out_dy)
+    return out_dx, out_dy
+
+
+def quantize_flow(dx, dy, dtype=np.int8):
+    """
+    Quantize flow components to small integers for sending to the browser.
+    
+    Both components share one scale, so vector directions are preserved.
+    int8 vectors are a quarter of the size of the float32 arrays the flow
+    models otherwise send, int16 half the size.
+    
+    Args:
+        dx, dy: Flow components (arrays of the same length)
+        dtype: np.int8 (1 byte per value) or np.int16 (2 bytes)
+    
+    Returns:
+        dx, dy as integer arrays, and the scale that maps them back to flow
+        units (pass it as value_scale to the flow models)
+    
+    Raises:
+        ValueError: if dx or dy holds NaN or infinite values, which have no
+            integer representation
+    """
+    dx = np.asarray(dx)
+    dy = np.asarray(dy)
+    
+    if not (np.isfinite(dx).all() and np.isfinite(dy).all()):
+        raise ValueError("quantize_flow needs finite dx/dy values (found NaN or inf)")
+    
+    peak = max(np.abs(dx).max(initial=0), np.abs(dy).max(initial=0))
+    scale = float(peak) / np.iinfo(dtype).max if peak > 0 else 1.0
+    
+    return (np.rint(dx / scale).astype(dtype),
+            np.rint(dy / scale).astype(dtype),
+            scale)
@@ -0,0 +1,38 @@
+"""
+Bokeh property helpers shared by the flow field models
+"""
+
+import numpy as np
+from bokeh.core.properties import Array, Float, Seq
+
+
+# Integer dtypes produced by flow_kernels.quantize_flow, sent unconverted
+_QUANTIZED_DTYPES = (np.int8, np.int16)
+
+
+def _float32_array(values):
+    """Coerce a list or array of flow values to a float32 array."""
+    return np.asarray(values, dtype=np.float32)
+
+
+class _Float32Array(Array):
+    """Array property stored as float32, or as-is for quantized int8/int16."""
+
+    def transform(self, value):
+        value = super().transform(value)
+        if isinstance(value, np.ndarray) and value.dtype in _QUANTIZED_DTYPES:
+            return value
+        return _float32_array(value)
+
+
+def flow_array(help):
+    """
+    Float array property; lists and other arrays become float32.
+
+    Flow generators should hand these properties float32 NumPy arrays:
+    Bokeh sends them to the browser as binary buffers that the renderer
+    reads as typed arrays, rather than as JSON lists with one boxed
+    Python float per value.
+    """
+    return _Float32Array(Float, default=lambda: np.zeros(0, dtype=np.float32),
+                         help=help).accepts(Seq(Float), _float32_array)
@@ -2,6 +2,7 @@
 import * as p from "core/properties"
 import {LayoutDOM, LayoutDOMView} from "models/layouts/layout_dom"
 import {div} from "core/dom"
+import type {Arrayable} from "core/types"
 
 interface Particle {
   x: number
@@ -19,6 +20,8 @@ export class FlowFieldInteractiveView extends LayoutDOMView {
   private ctx?: CanvasRenderingContext2D
   private tooltip_el?: HTMLDivElement
   private animation_id?: number
+  private grid: Float32Array = new Float32Array(0)
+  private magnitudes: Float32Array = new Float32Array(0)
   private particles: Particle[] = []
   
   // Pan and zoom state
@@ -29,6 +32,11 @@ export class FlowFieldInteractiveView extends LayoutDOMView {
   private last_mouse_x: number = 0
   private last_mouse_y: number = 0
 
+  override initialize(): void {
+    super.initialize()
+    this.update_grid()
+  }
+
   override get child_models(): LayoutDOM[] {
     return []
   }
@@ -37,9 +45,11 @@ export class FlowFieldInteractiveView extends LayoutDOMView {
     super.connect_signals()
     
     // React to property changes from Python/Bokeh widgets
-    const {particle_count, particle_life, animate, background_color} = this.model.properties
+    const {particle_count, particle_life, animate, background_color,
+           x_coords, y_coords, dx_values, dy_values, value_scale} = this.model.properties
     
     this.on_change(particle_count, () => this.reset_particles())
+    this.on_change([x_coords, y_coords, dx_values, dy_values, value_scale], () => this.update_grid())
     this.on_change(particle_life, () => {
       // Update max life for existing particles
       for (const p of this.particles) {
@@ -232,23 +242,48 @@ export class FlowFieldInteractiveView extends LayoutDOMView {
     }
   }
 
-  private get_flow_at(x: number, y: number): {dx: number, dy: number, mag: number} {
-    if (!this.canvas) return {dx: 0, dy: 0, mag: 0}
-    
+  // Lookup tables rebuilt whenever the flow data changes. The grid is
+  // packed as [x, y, dx, dy] per point, so the nearest-point scan in
+  // get_flow_at walks one contiguous buffer instead of four. dx/dy are
+  // scaled back to flow units here (they may arrive quantized), and
+  // speeds are derived from them instead of being sent from Python.
+  private update_grid(): void {
     const xs = this.model.x_coords
     const ys = this.model.y_coords
     const dxs = this.model.dx_values
     const dys = this.model.dy_values
-    const mags = this.model.magnitudes
+    const scale = this.model.value_scale
+    const n = Math.min(xs.length, ys.length, dxs.length, dys.length)
+    this.grid = new Float32Array(4 * n)
+    this.magnitudes = new Float32Array(n)
+    for (let i = 0; i < n; i++) {
+      const dx = dxs[i] * scale
+      const dy = dys[i] * scale
+      this.grid[4 * i] = xs[i]
+      this.grid[4 * i + 1] = ys[i]
+      this.grid[4 * i + 2] = dx
+      this.grid[4 * i + 3] = dy
+      this.magnitudes[i] = Math.hypot(dx, dy)
+    }
+  }
+
+  private get_flow_at(x: number, y: number): {dx: number, dy: number, mag: number} {
+    if (!this.canvas) return {dx: 0, dy: 0, mag: 0}
     
-    if (xs.length === 0 || ys.length === 0) return {dx: 0, dy: 0, mag: 0}
+    const grid = this.grid
+    const n = this.magnitudes.length
     
-    // Find nearest grid point (simple nearest-neighbor interpolation)
+    if (n === 0) return {dx: 0, dy: 0, mag: 0}
+    
+    // Find nearest grid point (simple nearest-neighbor interpolation).
+    // Squared distances rank the same, so skip the sqrt
     let min_dist = Infinity
     let best_idx = 0
     
-    for (let i = 0; i < xs.length; i++) {
-      const dist = Math.sqrt((xs[i] - x)**2 + (ys[i] - y)**2)
+    for (let i = 0; i < n; i++) {
+      const ddx = grid[4 * i] - x
+      const ddy = grid[4 * i + 1] - y
+      const dist = ddx * ddx + ddy * ddy
       if (dist < min_dist) {
         min_dist = dist
         best_idx = i
@@ -256,9 +291,9 @@ export class FlowFieldInteractiveView extends LayoutDOMView {
     }
     
     return {
-      dx: dxs[best_idx],
-      dy: dys[best_idx],
-      mag: mags[best_idx]
+      dx: grid[4 * best_idx + 2],
+      dy: grid[4 * best_idx + 3],
+      mag: this.magnitudes[best_idx]
     }
   }
 
@@ -350,21 +385,19 @@ export class FlowFieldInteractiveView extends LayoutDOMView {
     if (!this.ctx) return
     
     const ctx = this.ctx
-    const xs = this.model.x_coords
-    const ys = this.model.y_coords
-    const dxs = this.model.dx_values
-    const dys = this.model.dy_values
+    const grid = this.grid
+    const n = this.magnitudes.length
     
     ctx.strokeStyle = '#ffffff'
     ctx.lineWidth = 1 / this.zoom  // Adjust line width for zoom
     ctx.globalAlpha = 0.3
     
     // Subsample for performance
-    for (let i = 0; i < xs.length; i += 3) {
-      const x = xs[i]
-      const y = ys[i]
-      const dx = dxs[i] * 20  // Scale for visibility
-      const dy = dys[i] * 20
+    for (let i = 0; i < n; i += 3) {
+      const x = grid[4 * i]
+      const y = grid[4 * i + 1]
+      const dx = grid[4 * i + 2] * 20  // Scale for visibility
+      const dy = grid[4 * i + 3] * 20
       
       ctx.beginPath()
       ctx.moveTo(x, y)
@@ -454,11 +487,11 @@ export class FlowFieldInteractiveView extends LayoutDOMView {
 export namespace FlowFieldInteractive {
   export type Attrs = p.AttrsOf<Props>
   export type Props = LayoutDOM.Props & {
-    x_coords: p.Property<number[]>
-    y_coords: p.Property<number[]>
-    dx_values: p.Property<number[]>
-    dy_values: p.Property<number[]>
-    magnitudes: p.Property<number[]>
+    x_coords: p.Property<Arrayable<number>>
+    y_coords: p.Property<Arrayable<number>>
+    dx_values: p.Property<Arrayable<number>>
+    dy_values: p.Property<Arrayable<number>>
+    value_scale: p.Property<number>
     particle_count: p.Property<number>
     particle_size: p.Property<number>
     particle_life: p.Property<number>
@@ -483,12 +516,12 @@ export class FlowFieldInteractive extends LayoutDOM {
 
   static {
     this.prototype.default_view = FlowFieldInteractiveView
-    this.define<FlowFieldInteractive.Props>(({Bool, Float, Int, List, String}) => ({
-      x_coords: [ List(Float), [] ],
-      y_coords: [ List(Float), [] ],
-      dx_values: [ List(Float), [] ],
-      dy_values: [ List(Float), [] ],
-      magnitudes: [ List(Float), [] ],
+    this.define<FlowFieldInteractive.Props>(({Arrayable, Bool, Float, Int, String}) => ({
+      x_coords: [ Arrayable(Float), [] ],
+      y_coords: [ Arrayable(Float), [] ],
+      dx_values: [ Arrayable(Float), [] ],
+      dy_values: [ Arrayable(Float), [] ],
+      value_scale: [ Float, 1.0 ],
       particle_count: [ Int, 3000 ],
       particle_size: [ Float, 2 ],
       particle_life: [ Int, 100 ],
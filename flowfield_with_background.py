@@ -1,5 +1,7 @@
-from bokeh.core.properties import Int, Float, String, Bool, List
+from bokeh.core.properties import Int, Float, String, Bool
 from bokeh.models import LayoutDOM
+from flow_properties import flow_array
+
 
 class FlowFieldWithBackground(LayoutDOM):
     """
@@ -20,7 +22,12 @@ class FlowFieldWithBackground(LayoutDOM):
     - y_coords: Y positions of grid points  
     - dx_values: X component of flow vector at each point
     - dy_values: Y component of flow vector at each point
-    - magnitudes: Magnitude of flow at each point
+    
+    These accept lists or NumPy arrays. Values are converted to float32
+    on assignment and sent to the browser as binary typed arrays instead
+    of JSON number lists. dx_values/dy_values may also be int8/int16
+    arrays from flow_kernels.quantize_flow, with value_scale set to the
+    returned scale.
     
     Background image:
     - background_image: Base64 data URI or image URL
@@ -32,11 +39,11 @@ class FlowFieldWithBackground(LayoutDOM):
     __implementation__ = "flowfield_with_background.ts"
     
     # Flow field data
-    x_coords = List(Float, help="X coordinates of flow field grid points")
-    y_coords = List(Float, help="Y coordinates of flow field grid points")
-    dx_values = List(Float, help="X component of velocity at each grid point")
-    dy_values = List(Float, help="Y component of velocity at each grid point")
-    magnitudes = List(Float, help="Magnitude of velocity at each grid point")
+    x_coords = flow_array("X coordinates of flow field grid points")
+    y_coords = flow_array("Y coordinates of flow field grid points")
+    dx_values = flow_array("X component of velocity at each grid point")
+    dy_values = flow_array("Y component of velocity at each grid point")
+    value_scale = Float(1.0, help="Factor applied to dx_values/dy_values (for quantized data)")
     
     # Particle settings
     particle_count = Int(3000, help="Number of particles")
@@ -2,6 +2,7 @@
 import * as p from "core/properties"
 import {LayoutDOM, LayoutDOMView} from "models/layouts/layout_dom"
 import {div} from "core/dom"
+import type {Arrayable} from "core/types"
 
 interface Particle {
   x: number
@@ -24,6 +25,8 @@ export class FlowFieldWithBackgroundView extends LayoutDOMView {
   private tooltip_el?: HTMLDivElement
   private background_img?: HTMLImageElement
   private animation_id?: number
+  private grid: Float32Array = new Float32Array(0)
+  private magnitudes: Float32Array = new Float32Array(0)
   private particles: Particle[] = []
   private frame_count: number = 0  // Track frames for periodic refresh
   
@@ -35,6 +38,11 @@ export class FlowFieldWithBackgroundView extends LayoutDOMView {
   private last_mouse_x: number = 0
   private last_mouse_y: number = 0
 
+  override initialize(): void {
+    super.initialize()
+    this.update_grid()
+  }
+
   override get child_models(): LayoutDOM[] {
     return []
   }
@@ -42,9 +50,11 @@ export class FlowFieldWithBackgroundView extends LayoutDOMView {
   override connect_signals(): void {
     super.connect_signals()
     
-    const {particle_count, particle_life, animate, background_color, background_image, particle_trail} = this.model.properties
+    const {particle_count, particle_life, animate, background_color, background_image, particle_trail,
+           x_coords, y_coords, dx_values, dy_values, value_scale} = this.model.properties
     
     this.on_change(particle_count, () => this.reset_particles())
+    this.on_change([x_coords, y_coords, dx_values, dy_values, value_scale], () => this.update_grid())
     this.on_change(particle_life, () => {
       for (const p of this.particles) {
         p.maxLife = this.model.particle_life
@@ -319,22 +329,48 @@ export class FlowFieldWithBackgroundView extends LayoutDOMView {
     }
   }
 
-  private get_flow_at(x: number, y: number): {dx: number, dy: number, mag: number} {
-    if (!this.canvas) return {dx: 0, dy: 0, mag: 0}
-    
+  // Lookup tables rebuilt whenever the flow data changes. The grid is
+  // packed as [x, y, dx, dy] per point, so the nearest-point scan in
+  // get_flow_at walks one contiguous buffer instead of four. dx/dy are
+  // scaled back to flow units here (they may arrive quantized), and
+  // speeds are derived from them instead of being sent from Python.
+  private update_grid(): void {
     const xs = this.model.x_coords
     const ys = this.model.y_coords
     const dxs = this.model.dx_values
     const dys = this.model.dy_values
-    const mags = this.model.magnitudes
+    const scale = this.model.value_scale
+    const n = Math.min(xs.length, ys.length, dxs.length, dys.length)
+    this.grid = new Float32Array(4 * n)
+    this.magnitudes = new Float32Array(n)
+    for (let i = 0; i < n; i++) {
+      const dx = dxs[i] * scale
+      const dy = dys[i] * scale
+      this.grid[4 * i] = xs[i]
+      this.grid[4 * i + 1] = ys[i]
+      this.grid[4 * i + 2] = dx
+      this.grid[4 * i + 3] = dy
+      this.magnitudes[i] = Math.hypot(dx, dy)
+    }
+  }
+
+  private get_flow_at(x: number, y: number): {dx: number, dy: number, mag: number} {
+    if (!this.canvas) return {dx: 0, dy: 0, mag: 0}
     
-    if (xs.length === 0 || ys.length === 0) return {dx: 0, dy: 0, mag: 0}
+    const grid = this.grid
+    const n = this.magnitudes.length
     
+    if (n === 0) return {dx: 0, dy: 0, mag: 0}
+    
+    // Find nearest grid point (simple nearest-neighbor interpolation).
+    // Squared distances rank the same, so skip the sqrt
     let min_dist = Infinity
     let best_idx = 0
     
-    for (let i = 0; i < xs.length; i++) {
-      const dist = Math.sqrt((xs[i] - x)**2 + (ys[i] - y)**2)
+    for (let i = 0; i < n; i++) {
+      const ddx = grid[4 * i] - x
+      const ddy = grid[4 * i + 1] - y
+      const dist = ddx * ddx + ddy * ddy
       if (dist < min_dist) {
         min_dist = dist
         best_idx = i
@@ -342,9 +378,9 @@ export class FlowFieldWithBackgroundView extends LayoutDOMView {
     }
     
     return {
-      dx: dxs[best_idx],
-      dy: dys[best_idx],
-      mag: mags[best_idx]
+      dx: grid[4 * best_idx + 2],
+      dy: grid[4 * best_idx + 3],
+      mag: this.magnitudes[best_idx]
     }
   }
 
@@ -503,10 +539,8 @@ export class FlowFieldWithBackgroundView extends LayoutDOMView {
   }
 
   private draw_vectors(ctx: CanvasRenderingContext2D): void {
-    const xs = this.model.x_coords
-    const ys = this.model.y_coords
-    const dxs = this.model.dx_values
-    const dys = this.model.dy_values
+    const grid = this.grid
+    const n = this.magnitudes.length
     
     ctx.strokeStyle = this.model.vector_color
     ctx.lineWidth = this.model.vector_width / this.zoom
@@ -514,11 +548,11 @@ export class FlowFieldWithBackgroundView extends LayoutDOMView {
     
     const subsample = Math.max(1, Math.floor(5 / this.zoom))
     
-    for (let i = 0; i < xs.length; i += subsample) {
-      const x = xs[i]
-      const y = ys[i]
-      const dx = dxs[i] * this.model.vector_scale
-      const dy = dys[i] * this.model.vector_scale
+    for (let i = 0; i < n; i += subsample) {
+      const x = grid[4 * i]
+      const y = grid[4 * i + 1]
+      const dx = grid[4 * i + 2] * this.model.vector_scale
+      const dy = grid[4 * i + 3] * this.model.vector_scale
       
       ctx.beginPath()
       ctx.moveTo(x, y)
@@ -616,11 +650,11 @@ export class FlowFieldWithBackgroundView extends LayoutDOMView {
 export namespace FlowFieldWithBackground {
   export type Attrs = p.AttrsOf<Props>
   export type Props = LayoutDOM.Props & {
-    x_coords: p.Property<number[]>
-    y_coords: p.Property<number[]>
-    dx_values: p.Property<number[]>
-    dy_values: p.Property<number[]>
-    magnitudes: p.Property<number[]>
+    x_coords: p.Property<Arrayable<number>>
+    y_coords: p.Property<Arrayable<number>>
+    dx_values: p.Property<Arrayable<number>>
+    dy_values: p.Property<Arrayable<number>>
+    value_scale: p.Property<number>
     particle_count: p.Property<number>
     particle_size: p.Property<number>
     particle_life: p.Property<number>
@@ -652,12 +686,12 @@ export class FlowFieldWithBackground extends LayoutDOM {
 
   static {
     this.prototype.default_view = FlowFieldWithBackgroundView
-    this.define<FlowFieldWithBackground.Props>(({Bool, Float, Int, List, String}) => ({
-      x_coords: [ List(Float), [] ],
-      y_coords: [ List(Float), [] ],
-      dx_values: [ List(Float), [] ],
-      dy_values: [ List(Float), [] ],
-      magnitudes: [ List(Float), [] ],
+    this.define<FlowFieldWithBackground.Props>(({Arrayable, Bool, Float, Int, String}) => ({
+      x_coords: [ Arrayable(Float), [] ],
+      y_coords: [ Arrayable(Float), [] ],
+      dx_values: [ Arrayable(Float), [] ],
+      dy_values: [ Arrayable(Float), [] ],
+      value_scale: [ Float, 1.0 ],
       particle_count: [ Int, 3000 ],
       particle_size: [ Float, 2 ],
       particle_life: [ Int, 100 ],
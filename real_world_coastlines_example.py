@@ -1,41 +1,49 @@
 """
 REAL WORLD COASTLINES WITH CARTOPY
 
-Uses actual geographic coastline data from Cartopy to create
+Uses actual geographic coastline data (Natural Earth) to create
 a realistic ocean current flow field visualization over real continents.
 
 Requirements:
-    pip install cartopy pillow bokeh
+    pip install pillow bokeh
+    pip install cartopy  (only without assets/coastlines_global.png)
 
 This example shows:
-1. Loading real coastline data from Natural Earth via Cartopy
-2. Rendering coastlines to a PNG background image
+1. Cropping real coastlines from the prebaked global image written by
+   scripts/prebake_coastlines.py, or rendering them with Cartopy when
+   that image is missing
+2. Producing the coastlines as a PNG background image
 3. Overlaying realistic ocean currents on the geographic map
 4. Interactive zoom/pan with unified coordinate system
 """
 
-from bokeh.plotting import output_file, save, figure
-from bokeh.layouts import column, row
-from bokeh.models import Div, Slider, Select, CheckboxGroup, Button
-from bokeh.models import CustomJS
+from bokeh.plotting import output_file, save
+from bokeh.layouts import column
 from flowfield_with_background import FlowFieldWithBackground
-from PIL import Image, ImageDraw
+from controls import make_controls
+from background_utils import _data_uri, cached_data_uri
+from PIL import Image
+import functools
+import importlib.util
 import io
-import base64
-import math
-
-try:
-    import cartopy.crs as ccrs
-    import cartopy.feature as cfeature
-    import matplotlib
-    matplotlib.use('Agg')  # Non-interactive backend
-    import matplotlib.pyplot as plt
-    CARTOPY_AVAILABLE = True
-except ImportError:
-    CARTOPY_AVAILABLE = False
-    print("⚠️  Cartopy not installed!")
-    print("   Install with: pip install cartopy")
-    print("   Falling back to simple example...")
+import os
+import numpy as np
+
+# Global PlateCarree coastline image written by scripts/prebake_coastlines.py.
+# When present, backgrounds are cropped from it instead of rendered by Cartopy.
+PREBAKED_COASTLINES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   'assets', 'coastlines_global.png')
+
+
+@functools.lru_cache(maxsize=None)
+def _have_cartopy():
+    """True if Cartopy is installed (checked without importing it)"""
+    return importlib.util.find_spec('cartopy') is not None
+
+
+def coastlines_available():
+    """True if coastline backgrounds can be built (prebaked image or Cartopy)"""
+    return os.path.exists(PREBAKED_COASTLINES) or _have_cartopy()
 
 # ============================================
 # CREATE REAL-WORLD COASTLINE BACKGROUND
@@ -44,7 +52,14 @@ except ImportError:
 def create_cartopy_background(lon_min=-100, lon_max=10, lat_min=20, lat_max=70, 
                                width=1000, height=700, dpi=100):
     """
-    Create a background image with real-world coastlines using Cartopy.
+    Create a background image with real-world coastlines.
+    
+    If the prebaked global coastline image exists, the region is cropped
+    from it and resized with PIL. Otherwise it is rendered with Cartopy.
+    Results are cached in memory and on disk (see
+    background_utils.cached_data_uri) per extent, size and source, so
+    re-running scripts/prebake_coastlines.py or removing its image makes
+    a new background instead of reusing the old one.
     
     Parameters
     ----------
@@ -62,7 +77,81 @@ def create_cartopy_background(lon_min=-100, lon_max=10, lat_min=20, lat_max=70,
     str
         Base64-encoded PNG image data URI
     """
-    if not CARTOPY_AVAILABLE:
+    return _cached_background(_coastline_source(), lon_min, lon_max, lat_min, lat_max,
+                              width, height, dpi)
+
+
+def _coastline_source():
+    """Where backgrounds come from: ('prebaked', image mtime) or 'cartopy'"""
+    try:
+        return ('prebaked', os.path.getmtime(PREBAKED_COASTLINES))
+    except OSError:
+        return 'cartopy'
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_background(source, lon_min, lon_max, lat_min, lat_max, width, height, dpi):
+    key = ('cartopy_background', source, lon_min, lon_max, lat_min, lat_max,
+           width, height, dpi)
+    return cached_data_uri(key, lambda: _background_data_uri(
+        source, lon_min, lon_max, lat_min, lat_max, width, height, dpi))
+
+
+def _background_data_uri(source, lon_min, lon_max, lat_min, lat_max, width, height, dpi):
+    if source == 'cartopy':
+        png_bytes = render_cartopy_png(lon_min, lon_max, lat_min, lat_max,
+                                       width, height, dpi)
+    else:
+        png_bytes = crop_prebaked_coastlines(lon_min, lon_max, lat_min, lat_max,
+                                             width, height)
+    
+    return _data_uri('image/png', png_bytes)
+
+
+def crop_prebaked_coastlines(lon_min, lon_max, lat_min, lat_max, width, height):
+    """
+    Cut a region out of the prebaked global coastline image.
+    
+    The global image is PlateCarree, so longitude and latitude map linearly
+    to pixel columns and rows.
+    
+    Returns
+    -------
+    bytes
+        PNG image of exactly width x height pixels
+    """
+    with Image.open(PREBAKED_COASTLINES) as world:
+        box = (
+            (lon_min + 180) / 360 * world.width,
+            (90 - lat_max) / 180 * world.height,
+            (lon_max + 180) / 360 * world.width,
+            (90 - lat_min) / 180 * world.height,
+        )
+        region = world.resize((width, height), Image.BILINEAR, box=box)
+    
+    buf = io.BytesIO()
+    region.save(buf, format='PNG', compress_level=1, optimize=False)
+    return buf.getvalue()
+
+
+def render_cartopy_png(lon_min, lon_max, lat_min, lat_max, width, height, dpi=100):
+    """
+    Render coastlines for a region with Cartopy.
+    
+    Returns
+    -------
+    bytes
+        PNG image data
+    """
+    # Cartopy pulls in shapely, pyproj and matplotlib, so it is only
+    # imported when a map is actually rendered
+    try:
+        import cartopy.crs as ccrs
+        import cartopy.feature as cfeature
+        import matplotlib
+        matplotlib.use('Agg')  # Non-interactive backend
+        import matplotlib.pyplot as plt
+    except ImportError:
         raise ImportError("Cartopy is required for real-world coastlines")
     
     # Create figure with exact pixel dimensions
@@ -102,15 +191,11 @@ def create_cartopy_background(lon_min=-100, lon_max=10, lat_min=20, lat_max=70,
     # Save to bytes
     buf = io.BytesIO()
     plt.savefig(buf, format='png', dpi=dpi, bbox_inches='tight', 
-                pad_inches=0, facecolor='#0a1929')
+                pad_inches=0, facecolor='#0a1929',
+                pil_kwargs={'compress_level': 1})
     plt.close(fig)
     
-    # Convert to base64 data URI
-    buf.seek(0)
-    img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    data_uri = f"data:image/png;base64,{img_base64}"
-    
-    return data_uri
+    return buf.getvalue()
 
 # ============================================
 # GENERATE REALISTIC OCEAN CURRENTS
@@ -132,150 +217,49 @@ def generate_currents(lon_min=-100, lon_max=10, lat_min=20, lat_max=70,
     Returns
     -------
     tuple
-        (x_coords, y_coords, dx_values, dy_values, magnitudes)
+        (x_coords, y_coords, dx_values, dy_values) as 1-D float32 arrays.
+        Vector magnitudes are derived in the browser.
     """
     grid_size = 50  # Grid resolution
     
-    x_coords = []
-    y_coords = []
-    dx_values = []
-    dy_values = []
-    magnitudes = []
-    
-    # Convert lat/lon to pixel coordinates
-    def latlon_to_pixel(lon, lat):
-        x = (lon - lon_min) / (lon_max - lon_min) * width
-        y = (lat_max - lat) / (lat_max - lat_min) * height  # Flip Y
-        return x, y
-    
-    # Convert pixel to lat/lon
-    def pixel_to_latlon(x, y):
-        lon = lon_min + (x / width) * (lon_max - lon_min)
-        lat = lat_max - (y / height) * (lat_max - lat_min)  # Flip Y
-        return lon, lat
-    
-    for i in range(grid_size + 1):
-        for j in range(grid_size + 1):
-            # Pixel coordinates
-            x = (i / grid_size) * width
-            y = (j / grid_size) * height
-            
-            # Geographic coordinates
-            lon, lat = pixel_to_latlon(x, y)
-            
-            # Initialize flow components
-            dx_total = 0
-            dy_total = 0
-            
-            # ===================================
-            # BACKGROUND CIRCULATION
-            # Subtle basin-wide patterns
-            # ===================================
-            bg_dx = 0.15 * math.cos(lat * math.pi / 180 * 2)
-            bg_dy = 0.1 * math.sin(lon * math.pi / 180 * 2)
-            dx_total += bg_dx
-            dy_total += bg_dy
-            
-            # Calculate magnitude
-            magnitude = math.sqrt(dx_total**2 + dy_total**2)
-            
-            x_coords.append(x)
-            y_coords.append(y)
-            dx_values.append(dx_total)
-            dy_values.append(dy_total)
-            magnitudes.append(magnitude)
-    
-    return x_coords, y_coords, dx_values, dy_values, magnitudes
+    # Pixel axes (x varies along the first grid axis) and the matching
+    # geographic axes. Pixels map linearly to degrees, so those are evenly
+    # spaced too (y is flipped: row 0 is lat_max)
+    xs = np.linspace(0.0, width, grid_size + 1)
+    ys = np.linspace(0.0, height, grid_size + 1)
+    lons = np.linspace(lon_min, lon_max, grid_size + 1)
+    lats = np.linspace(lat_max, lat_min, grid_size + 1)
+    
+    # All four outputs live in one preallocated block, written in place
+    # and cast to float32 in a single call
+    out = np.empty((4, grid_size + 1, grid_size + 1))
+    x, y, dx, dy = out
+    x[...] = xs[:, None]
+    y[...] = ys[None, :]
+    
+    # ===================================
+    # BACKGROUND CIRCULATION
+    # Subtle basin-wide patterns. dx depends only on latitude and dy only
+    # on longitude, so evaluate the trig on the 1-D axes and broadcast
+    # ===================================
+    two_rad = np.pi / 90  # degrees -> radians, doubled, in one factor
+    dx[...] = 0.15 * np.cos(lats * two_rad)[None, :]
+    dy[...] = 0.1 * np.sin(lons * two_rad)[:, None]
+    
+    # One float32 cast covers all four outputs
+    return tuple(out.reshape(4, -1).astype(np.float32))
 
 # ============================================
 # CREATE CONTROLS
 # ============================================
 
+# Color schemes offered by the controls
+COLOR_SCHEMES = ['yellow', 'red', 'purple', 'blue', 'lightblue', 'lime', 'white', 'pink']
+
 def create_controls(flow, width):
     """Create Bokeh widget controls for the flow field"""
-    
-    # Particle controls
-    particle_slider = Slider(
-        start=1000, end=15000, value=flow.particle_count, step=1000,
-        title="Particle Count", width=260
-    )
-    particle_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.particle_count = cb_obj.value;"))
-    
-    size_slider = Slider(
-        start=1, end=6, value=flow.particle_size, step=0.5,
-        title="Particle Size", width=260
-    )
-    size_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.particle_size = cb_obj.value;"))
-    
-    # Flow controls
-    strength_slider = Slider(
-        start=0.5, end=10, value=flow.flow_strength, step=0.5,
-        title="Flow Strength", width=260
-    )
-    strength_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.flow_strength = cb_obj.value;"))
-    
-    speed_slider = Slider(
-        start=0.1, end=3, value=flow.animation_speed, step=0.1,
-        title="Animation Speed", width=260
-    )
-    speed_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.animation_speed = cb_obj.value;"))
-    
-    # Visual controls
-    color_select = Select(
-        title="Color Scheme", value=flow.color_scheme,
-        options=['yellow', 'red', 'purple', 'blue', 'lightblue', 'lime', 'white', 'pink'],
-        width=260
-    )
-    color_select.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.color_scheme = cb_obj.value;"))
-    
-    bg_alpha_slider = Slider(
-        start=0, end=1, value=flow.background_alpha, step=0.1,
-        title="Background Opacity", width=260
-    )
-    bg_alpha_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.background_alpha = cb_obj.value;"))
-    
-    # Options
-    options_checks = CheckboxGroup(
-        labels=["Show Flow Vectors", "Particle Trails"],
-        active=[1] if flow.particle_trail else [],
-        width=260
-    )
-    options_checks.js_on_change('active', CustomJS(
-        args=dict(f=flow),
-        code="""
-        f.show_vectors = cb_obj.active.includes(0);
-        f.particle_trail = cb_obj.active.includes(1);
-        """
-    ))
-    
-    # Play/Pause
-    play_button = Button(label="⏸ Pause", button_type="success", width=260)
-    play_button.js_on_click(CustomJS(args=dict(f=flow, b=play_button), code="""
-        f.animate = !f.animate;
-        b.label = f.animate ? '⏸ Pause' : '▶ Play';
-        b.button_type = f.animate ? 'success' : 'warning';
-    """))
-    
-    controls_panel = column(
-        Div(text="", width=30),
-        column(particle_slider, size_slider, width=260),
-        Div(text="", width=30),
-        column(strength_slider, speed_slider, width=260),
-        Div(text="", width=30),
-        column(color_select, bg_alpha_slider, options_checks, play_button, width=260),
-        Div(text="", width=30),
-        sizing_mode="fixed",
-        styles={'background': '#f8f9fa', 'padding': '20px', 
-                'border-radius': '0 0 8px 8px'}
-    )
-    
-    return column(controls_panel, sizing_mode="fixed")
+    return make_controls(flow, width, color_options=COLOR_SCHEMES, particle_range=(1000, 15000),
+                         vertical=True)
 
 # ============================================
 # MAIN EXAMPLE
@@ -284,15 +268,16 @@ def create_controls(flow, width):
 def main():
     """Create the real-world coastline example"""
     
-    if not CARTOPY_AVAILABLE:
+    if not coastlines_available():
         print("\n" + "="*70)
-        print("ERROR: Cartopy is required for this example")
+        print("ERROR: Cartopy or a prebaked coastline image is required")
         print("="*70)
         print("\nInstall with:")
         print("  pip install cartopy")
         print("\nNote: Cartopy installation can be complex. If you have issues:")
         print("  - Try: conda install -c conda-forge cartopy")
         print("  - Or see: https://scitools.org.uk/cartopy/docs/latest/installing.html")
+        print("  - Or copy a prebaked assets/coastlines_global.png")
         print("="*70)
         return
     
@@ -312,7 +297,10 @@ def main():
     print("="*70)
     print(f"Region: {lat_min}°N to {lat_max}°N, {lon_min}°E to {lon_max}°E")
     print(f"Resolution: {width}x{height} pixels")
-    print("Loading Natural Earth coastline data via Cartopy...")
+    if os.path.exists(PREBAKED_COASTLINES):
+        print(f"Cropping coastlines from {PREBAKED_COASTLINES}...")
+    else:
+        print("Loading Natural Earth coastline data via Cartopy...")
     
     # Create background with real coastlines
     bg_image = create_cartopy_background(
@@ -325,7 +313,7 @@ def main():
     print("✓ Coastline background created")
     
 
-    x, y, dx, dy, mag = generate_currents(
+    x, y, dx, dy = generate_currents(
         lon_min=lon_min, lon_max=lon_max,
         lat_min=lat_min, lat_max=lat_max,
         width=width, height=height
@@ -343,7 +331,6 @@ def main():
         y_coords=y,
         dx_values=dx,
         dy_values=dy,
-        magnitudes=mag,
         
         # Particle settings
         particle_count=2000,
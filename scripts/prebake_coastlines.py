@@ -0,0 +1,46 @@
+"""
+PREBAKE GLOBAL COASTLINES
+
+Renders the whole world once with Cartopy and saves it as
+assets/coastlines_global.png. create_cartopy_background() then crops
+regions out of this image with PIL, so the examples no longer need
+Cartopy (or matplotlib) at runtime.
+
+Requirements:
+    pip install cartopy pillow
+
+Usage:
+    python scripts/prebake_coastlines.py [width height]
+"""
+
+import os
+import sys
+
+# Run from anywhere: the example modules live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from real_world_coastlines_example import PREBAKED_COASTLINES, render_cartopy_png
+
+
+def main():
+    width, height = 4096, 2048
+    if len(sys.argv) == 3:
+        width, height = int(sys.argv[1]), int(sys.argv[2])
+
+    print(f"Rendering global coastlines at {width}x{height} pixels...")
+    png_bytes = render_cartopy_png(
+        lon_min=-180, lon_max=180,
+        lat_min=-90, lat_max=90,
+        width=width, height=height,
+        dpi=100
+    )
+
+    os.makedirs(os.path.dirname(PREBAKED_COASTLINES), exist_ok=True)
+    with open(PREBAKED_COASTLINES, 'wb') as f:
+        f.write(png_bytes)
+
+    print(f"✓ Saved {PREBAKED_COASTLINES}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import os
+import sys
+
+from bokeh.document import Document
+from bokeh.models import Slider
+
+# Run from anywhere: the modules under test live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controls import make_controls
+from flowfield_interactive import FlowFieldInteractive
+from flowfield_with_background import FlowFieldWithBackground
+
+
+def slider_names(panel):
+    return {slider.name for slider in panel.select({'type': Slider})}
+
+
+def test_default_panel_skips_properties_the_model_lacks():
+    panel = make_controls(FlowFieldInteractive(), 700, color_options=['viridis'])
+
+    assert 'background_alpha' not in slider_names(panel)
+    assert 'particle_count' in slider_names(panel)
+
+
+def test_default_panel_on_background_model_has_opacity_slider():
+    panel = make_controls(FlowFieldWithBackground(), 700, color_options=['viridis'])
+
+    assert 'background_alpha' in slider_names(panel)
+
+
+def test_panels_can_go_into_separate_documents():
+    for _ in range(2):
+        doc = Document()
+        doc.add_root(make_controls(FlowFieldWithBackground(), 700,
+                                   color_options=['viridis'], title="Flow"))
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Run from anywhere: the modules under test live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flow_kernels import quantize_flow
+
+
+def test_quantize_flow_round_trips_within_one_step():
+    dx = np.array([0.0, 0.5, -1.25, 2.0])
+    dy = np.array([1.0, -2.0, 0.25, 0.0])
+
+    qx, qy, scale = quantize_flow(dx, dy)
+
+    assert qx.dtype == np.int8 and qy.dtype == np.int8
+    assert scale == pytest.approx(2.0 / 127)
+    np.testing.assert_allclose(qx * scale, dx, atol=scale / 2)
+    np.testing.assert_allclose(qy * scale, dy, atol=scale / 2)
+
+
+def test_quantize_flow_all_zero_uses_unit_scale():
+    qx, qy, scale = quantize_flow(np.zeros(3), np.zeros(3))
+
+    assert scale == 1.0
+    assert not qx.any() and not qy.any()
+
+
+@pytest.mark.parametrize("bad", [np.nan, np.inf, -np.inf])
+def test_quantize_flow_rejects_non_finite(bad):
+    dx = np.array([0.5, bad, 1.0])
+    dy = np.array([0.1, 0.2, 0.3])
+
+    with pytest.raises(ValueError, match="finite"):
+        quantize_flow(dx, dy)
+    with pytest.raises(ValueError, match="finite"):
+        quantize_flow(dy, dx)
@@ -11,85 +11,122 @@ All support zoom, pan, and hover tooltips!
 """
 
 from bokeh.plotting import output_file, save, figure
-from bokeh.layouts import column, row
-from bokeh.models import Div, Slider, Select, CheckboxGroup, Button
-from bokeh.models import CustomJS
+from bokeh.layouts import column
 from flowfield_with_background import FlowFieldWithBackground
+from controls import make_controls
 from background_utils import create_coastline_background, prepare_background
+from flow_kernels import NUMBA_AVAILABLE, njit, prange
 import math
+import numpy as np
 
 # ============================================
 # GENERATE FLOW DATA
 # ============================================
 
-def generate_ocean_currents(width=900, height=700):
-    """Generate realistic ocean current flow field"""
-    grid_size = 45
+@njit(parallel=True, fastmath=True, cache=True)
+def _ocean_currents_kernel(xs, ys, width, height, out_dx, out_dy):
+    # Per-point version of _ocean_currents_numpy, compiled by Numba. The
+    # branches replace the masks, so no temporary grids are created, and
+    # rows are independent, so prange splits them across threads.
+    center_x, center_y = width * 0.6, height * 0.5
+    eddy1_x, eddy1_y = width * 0.25, height * 0.7
     
-    x_coords = []
-    y_coords = []
-    dx_values = []
-    dy_values = []
-    magnitudes = []
-    
-    for i in range(grid_size + 1):
-        for j in range(grid_size + 1):
-            x = (i / grid_size) * width
-            y = (j / grid_size) * height
-            
-            # Main gyre (large circular current)
-            center_x, center_y = width * 0.6, height * 0.5
-            dx_c = x - center_x
-            dy_c = y - center_y
-            dist = math.sqrt(dx_c**2 + dy_c**2)
-            
-            if dist > 0:
-                # Cyclonic flow
-                strength = math.exp(-dist / 180)
-                gyre_dx = -dy_c / dist * strength * 1.2
-                gyre_dy = dx_c / dist * strength * 1.2
-            else:
-                gyre_dx, gyre_dy = 0, 0
-            
-            # Coastal current (along western edge)
-            coastal_dist = abs(x - 80)
-            if coastal_dist < 100:
-                coastal_strength = (1 - coastal_dist / 100) * 0.8
-                coastal_dx = 0
-                coastal_dy = coastal_strength  # Northward flow
-            else:
-                coastal_dx, coastal_dy = 0, 0
-            
-            # Small eddies
-            eddy1_x, eddy1_y = width * 0.25, height * 0.7
-            dx_e1 = x - eddy1_x
-            dy_e1 = y - eddy1_y
-            dist_e1 = math.sqrt(dx_e1**2 + dy_e1**2)
+    for i in prange(xs.size):
+        # Coastal current (along western edge, northward). Depends on x only
+        coastal_dist = abs(xs[i] - 80)
+        coastal_dy = (1 - coastal_dist / 100) * 0.8 if coastal_dist < 100 else 0.0
+        
+        for j in range(ys.size):
+            # Main gyre (large circular current), cyclonic
+            dx_c = xs[i] - center_x
+            dy_c = ys[j] - center_y
+            dist = math.hypot(dx_c, dy_c)
+            strength = math.exp(-dist / 180) * 1.2 / dist if dist > 0 else 0.0
             
+            # Small eddy (counter-clockwise), 90 px radius
+            dx_e1 = xs[i] - eddy1_x
+            dy_e1 = ys[j] - eddy1_y
+            dist_e1 = math.hypot(dx_e1, dy_e1)
             if dist_e1 > 0 and dist_e1 < 90:
-                eddy_strength = (1 - dist_e1 / 90) * 0.5
-                eddy1_dx = dy_e1 / dist_e1 * eddy_strength  # Counter-clockwise
-                eddy1_dy = -dx_e1 / dist_e1 * eddy_strength
+                eddy_strength = (1 - dist_e1 / 90) * 0.5 / dist_e1
             else:
-                eddy1_dx, eddy1_dy = 0, 0
-            
-            # Eastward background flow
-            background_dx = 0.2
-            background_dy = 0.05 * math.sin(y / height * math.pi * 2)
-            
-            # Combine all components
-            dx = gyre_dx + coastal_dx + eddy1_dx + background_dx
-            dy = gyre_dy + coastal_dy + eddy1_dy + background_dy
-            
-            magnitude = math.sqrt(dx**2 + dy**2)
+                eddy_strength = 0.0
             
-            x_coords.append(x)
-            y_coords.append(y)
-            dx_values.append(dx)
-            dy_values.append(dy)
-            magnitudes.append(magnitude)
+            # Combine with the eastward background flow
+            out_dx[i, j] = -dy_c * strength + dy_e1 * eddy_strength + 0.2
+            out_dy[i, j] = (dx_c * strength + coastal_dy - dx_e1 * eddy_strength
+                            + 0.05 * math.sin(ys[j] / height * math.pi * 2))
+
+
+def _ocean_currents_numpy(xs, ys, x, y, width, height):
+    # Components are added into dx/dy in place, and the work grids
+    # (offsets, distance, strength) are reused between the gyre and the
+    # eddy, so only a few grids are allocated in total
+    
+    # Eastward background flow. dy depends on y only
+    dx = np.full_like(x, 0.2)
+    dy = np.empty_like(y)
+    dy[...] = 0.05 * np.sin(ys / height * np.pi * 2)[None, :]
+    
+    # Coastal current (along western edge, northward). Depends on x only
+    coastal_dist = np.abs(xs - 80)
+    dy += np.where(coastal_dist < 100, (1 - coastal_dist / 100) * 0.8, 0.0)[:, None]
+    
+    # Main gyre (large circular current), cyclonic: 1.2 * exp(-dist / 180)
+    # / dist. At the center both offsets are 0, so the strength left there
+    # does not matter
+    off_x = x - width * 0.6
+    off_y = y - height * 0.5
+    dist = np.hypot(off_x, off_y)
+    
+    strength = np.multiply(dist, -1 / 180)
+    np.exp(strength, out=strength)
+    strength *= 1.2
+    np.divide(strength, dist, out=strength, where=dist > 0)
+    
+    off_y *= strength
+    dx -= off_y
+    off_x *= strength
+    dy += off_x
+    
+    # Small eddy (counter-clockwise), 90 px radius: (1 - dist / 90) * 0.5
+    # / dist inside, 0 outside
+    np.subtract(x, width * 0.25, out=off_x)
+    np.subtract(y, height * 0.7, out=off_y)
+    np.hypot(off_x, off_y, out=dist)
+    
+    in_eddy = (dist > 0) & (dist < 90)
+    strength.fill(0.0)
+    np.divide(0.5, dist, out=strength, where=in_eddy)
+    np.subtract(strength, 0.5 / 90, out=strength, where=in_eddy)
+    
+    off_y *= strength
+    dx += off_y
+    off_x *= strength
+    dy -= off_x
+    
+    return dx, dy
+
+
+def generate_ocean_currents(width=900, height=700):
+    """Generate realistic ocean current flow field as x, y, dx, dy arrays"""
+    grid_size = 45
+    
+    # Grid positions in pixels (x varies along the first axis)
+    xs = np.linspace(0.0, width, grid_size + 1)
+    ys = np.linspace(0.0, height, grid_size + 1)
+    x, y = np.meshgrid(xs, ys, indexing='ij')
     
-    return x_coords, y_coords, dx_values, dy_values, magnitudes
+    # Compiled per-point loop when Numba is installed, else NumPy
+    if NUMBA_AVAILABLE:
+        dx = np.empty_like(x)
+        dy = np.empty_like(x)
+        _ocean_currents_kernel(xs, ys, float(width), float(height), dx, dy)
+    else:
+        dx, dy = _ocean_currents_numpy(xs, ys, x, y, width, height)
+    
+    return tuple(arr.ravel().astype(np.float32, copy=False)
+                 for arr in (x, y, dx, dy))
 
 # ============================================
 # APPROACH 1: PIL-Generated Coastlines
@@ -125,7 +162,7 @@ def example1_manual_coastlines():
     )
     
     # Generate flow data
-    x, y, dx, dy, mag = generate_ocean_currents(width, height)
+    x, y, dx, dy = generate_ocean_currents(width, height)
     
     # Create flow field with background
     flow = FlowFieldWithBackground(
@@ -135,7 +172,6 @@ def example1_manual_coastlines():
         y_coords=y,
         dx_values=dx,
         dy_values=dy,
-        magnitudes=mag,
         
         # Particle settings
         particle_count=1000,
@@ -225,7 +261,7 @@ def example2_bokeh_background():
         )
     
     # Generate flow data
-    x, y, dx, dy, mag = generate_ocean_currents(width, height)
+    x, y, dx, dy = generate_ocean_currents(width, height)
     
     # Create flow field
     flow = FlowFieldWithBackground(
@@ -235,7 +271,6 @@ def example2_bokeh_background():
         y_coords=y,
         dx_values=dx,
         dy_values=dy,
-        magnitudes=mag,
         particle_count=2000,
         particle_size=1.5,
         flow_strength=3.5,
@@ -251,100 +286,13 @@ def example2_bokeh_background():
 # CREATE CONTROLS
 # ============================================
 
+# Color schemes offered by the controls
+COLOR_SCHEMES = ['viridis', 'turbo', 'plasma', 'inferno', 'cividis', 'ocean', 'rainbow']
+
 def create_controls(flow, width):
     """Create Bokeh widget controls for the flow field"""
-    
-    # Particle controls
-    particle_slider = Slider(
-        start=1000, end=12000, value=flow.particle_count, step=1000,
-        title="Particle Count", width=260
-    )
-    particle_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.particle_count = cb_obj.value;"))
-    
-    size_slider = Slider(
-        start=1, end=6, value=flow.particle_size, step=0.5,
-        title="Particle Size", width=260
-    )
-    size_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.particle_size = cb_obj.value;"))
-    
-    # Flow controls
-    strength_slider = Slider(
-        start=0.5, end=10, value=flow.flow_strength, step=0.5,
-        title="Flow Strength", width=260
-    )
-    strength_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.flow_strength = cb_obj.value;"))
-    
-    speed_slider = Slider(
-        start=0.1, end=3, value=flow.animation_speed, step=0.1,
-        title="Animation Speed", width=260
-    )
-    speed_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.animation_speed = cb_obj.value;"))
-    
-    # Visual controls
-    color_select = Select(
-        title="Color Scheme", value=flow.color_scheme,
-        options=['viridis', 'turbo', 'plasma', 'inferno', 'cividis', 'ocean', 'rainbow'],
-        width=260
-    )
-    color_select.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.color_scheme = cb_obj.value;"))
-    
-    bg_alpha_slider = Slider(
-        start=0, end=1, value=flow.background_alpha, step=0.1,
-        title="Background Opacity", width=260
-    )
-    bg_alpha_slider.js_on_change('value', CustomJS(
-        args=dict(f=flow), code="f.background_alpha = cb_obj.value;"))
-    
-    # Options
-    options_checks = CheckboxGroup(
-        labels=["Show Flow Vectors", "Particle Trails"],
-        active=[1] if flow.particle_trail else [],
-        width=260
-    )
-    options_checks.js_on_change('active', CustomJS(
-        args=dict(f=flow),
-        code="""
-        f.show_vectors = cb_obj.active.includes(0);
-        f.particle_trail = cb_obj.active.includes(1);
-        """
-    ))
-    
-    # Play/Pause
-    play_button = Button(label="⏸ Pause", button_type="success", width=260)
-    play_button.js_on_click(CustomJS(args=dict(f=flow, b=play_button), code="""
-        f.animate = !f.animate;
-        b.label = f.animate ? '⏸ Pause' : '▶ Play';
-        b.button_type = f.animate ? 'success' : 'warning';
-    """))
-    
-    # Layout
-    controls_header = Div(text="""
-    <div style="font-family: system-ui; padding: 12px; 
-         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-         color: white; border-radius: 8px 8px 0 0; margin-top: 20px;">
-        <h3 style="margin: 0; font-size: 16px; font-weight: 600;">⚙️ Flow Field Controls</h3>
-    </div>
-    """, width=width)
-    
-    controls_panel = row(
-        Div(text="", width=30),
-        column(particle_slider, size_slider, width=260),
-        Div(text="", width=30),
-        column(strength_slider, speed_slider, width=260),
-        Div(text="", width=30),
-        column(color_select, bg_alpha_slider, options_checks, play_button, width=260),
-        Div(text="", width=30),
-        sizing_mode="fixed",
-        styles={'background': '#f8f9fa', 'padding': '20px', 
-                'border-radius': '0 0 8px 8px'}
-    )
-    
-    return column(controls_header, controls_panel, sizing_mode="fixed")
+    return make_controls(flow, width, color_options=COLOR_SCHEMES, particle_range=(1000, 12000),
+                         title="Flow Field")
 
 # ============================================
 # MAIN EXAMPLE